@@ -0,0 +1,697 @@
+"""
+This module handles an in-memory design database.
+It contains the observer that stores both snapshots in memory,
+the DesignDB that reads them and the expression evaluator
+that computes the built-in metrics natively, without a Neo4j server.
+"""
+import re
+from array import array
+from typing import Callable, Iterator, Optional
+from overrides import override
+from src.cdde.addons_api import CddeAPI
+from src.cdde.design_db import DesignDB, RelationshipType
+from src.cdde.expr_evaluator import ExprEvaluator, MetricType
+from src.cdde.puml_observer import (Observer, Modes, ClassKind, Relationship, MethodKind,
+                                    split_snapshot)
+
+KIND_FILTERS: dict[str, tuple[ClassKind, ...]] = {
+    'any': (ClassKind.CLASS, ClassKind.ABSTRACT, ClassKind.INTERFACE),
+    'class': (ClassKind.CLASS,),
+    'abstract': (ClassKind.ABSTRACT,),
+    'interface': (ClassKind.INTERFACE,),
+    'abstract_or_interface': (ClassKind.ABSTRACT, ClassKind.INTERFACE)
+}
+
+HIDDEN_METHODS = (MethodKind.PRIVATE, MethodKind.PROTECTED)
+
+
+class SnapshotGraph:
+    """
+    Design graph of one snapshot.
+    Class names are interned to ids, the attributes of the classes
+    are stored in lists indexed by id and the relationships
+    are stored as two arrays of ids per relationship type.
+    Names that are only found in relationships are library nodes,
+    they have no kind and are not considered classes.
+    """
+
+    def __init__(self) -> None:
+        self.ids: dict[str, int] = {}
+        self.names: list[str] = []
+        self.kinds: list[Optional[ClassKind]] = []
+        self.packages: list[Optional[str]] = []
+        self.methods: list[list[tuple[str, MethodKind]]] = []
+        self.edges: dict[Relationship, tuple[array, array]] = {}
+
+    def intern(self, name: str) -> int:
+        """
+        Get the id of a name, creating it if it does not exist.
+        """
+        node_id = self.ids.get(name)
+        if node_id is None:
+            node_id = len(self.names)
+            self.ids[name] = node_id
+            self.names.append(name)
+            self.kinds.append(None)
+            self.packages.append(None)
+            self.methods.append([])
+        return node_id
+
+    def add_class(self, name: str, kind: ClassKind) -> None:
+        """
+        Add a class, keeping the first kind found.
+        """
+        node_id = self.intern(name)
+        if self.kinds[node_id] is None:
+            self.kinds[node_id] = kind
+
+    def add_relation(self, class1: str, class2: str, relation: Relationship) -> None:
+        """
+        Add a relationship between two names.
+        """
+        sources, targets = self.edges.setdefault(
+            relation, (array('l'), array('l')))
+        sources.append(self.intern(class1))
+        targets.append(self.intern(class2))
+
+    def set_package(self, name: str, package_name: str) -> None:
+        """
+        Set the package of a name.
+        """
+        self.packages[self.intern(name)] = package_name
+
+    def add_method(self, class_name: str, method_name: str, kind: MethodKind) -> None:
+        """
+        Add a method to a name.
+        """
+        self.methods[self.intern(class_name)].append((method_name, kind))
+
+    def is_class(self, node_id: int, kind: str = 'any') -> bool:
+        """
+        Check if the id is a class of the given kind filter.
+        """
+        return self.kinds[node_id] in KIND_FILTERS[kind]
+
+    def class_id(self, name: str, kind: str = 'any') -> Optional[int]:
+        """
+        Get the id of a class of the given kind filter.
+        """
+        node_id = self.ids.get(name)
+        if node_id is None or not self.is_class(node_id, kind):
+            return None
+        return node_id
+
+    def classes(self, kind: str = 'any') -> Iterator[int]:
+        """
+        Iterate over the ids of the classes of the given kind filter.
+        """
+        for node_id in range(len(self.names)):
+            if self.is_class(node_id, kind):
+                yield node_id
+
+    def relations(self) -> Iterator[tuple[int, int, Relationship]]:
+        """
+        Iterate over the relationships between classes.
+        """
+        for relation, (sources, targets) in self.edges.items():
+            for source, target in zip(sources, targets):
+                if self.is_class(source) and self.is_class(target):
+                    yield source, target, relation
+
+    def degrees(self) -> tuple[list[int], list[int]]:
+        """
+        Number of relationships that leave and arrive to each class.
+        """
+        out_degree = [0] * len(self.names)
+        in_degree = [0] * len(self.names)
+        for source, target, _ in self.relations():
+            out_degree[source] += 1
+            in_degree[target] += 1
+        return out_degree, in_degree
+
+    def relation_names(self) -> dict[tuple[str, str], set[Relationship]]:
+        """
+        Get the relationships between classes by the names of its ends.
+        """
+        relations: dict[tuple[str, str], set[Relationship]] = {}
+        for source, target, relation in self.relations():
+            key = (self.names[source], self.names[target])
+            relations.setdefault(key, set()).add(relation)
+        return relations
+
+
+class DesignStore:
+    """
+    Holds the design graphs of the snapshots.
+    """
+
+    def __init__(self) -> None:
+        self.graphs: dict[Modes, SnapshotGraph] = {}
+
+    def graph(self, mode: Modes) -> SnapshotGraph:
+        """
+        Get the graph of a snapshot, creating it if it does not exist.
+        """
+        return self.graphs.setdefault(mode, SnapshotGraph())
+
+    def clear(self) -> None:
+        """
+        Delete all the snapshots.
+        """
+        self.graphs = {}
+
+    def shift(self) -> None:
+        """
+        Make the after snapshot the before snapshot, leaving the after empty.
+        """
+        self.graphs[Modes.BEFORE] = self.graphs.pop(Modes.AFTER, SnapshotGraph())
+
+
+class MemoryObserver(Observer):
+    """
+    Observer that stores the snapshots in memory.
+    """
+
+    def __init__(self, store: Optional[DesignStore] = None) -> None:
+        self.store = DesignStore() if store is None else store
+        self.mode: Modes
+        self.graph: SnapshotGraph
+
+    def delete_all(self) -> None:
+        """
+        Delete all the snapshots.
+        """
+        self.store.clear()
+
+    def shift_snapshots(self) -> None:
+        """
+        Make the after snapshot the before snapshot.
+        """
+        self.store.shift()
+
+    @override
+    def set_mode(self, mode: Modes) -> None:
+        """
+        Set the mode of the observer.
+        """
+        self.mode = mode
+        self.graph = self.store.graph(mode)
+
+    @override
+    def open_observer(self) -> None:
+        """
+        Event triggered when the observer is opened.
+        """
+
+    @override
+    def close_observer(self) -> None:
+        """
+        Event triggered when the observer is closed.
+        """
+
+    @override
+    def on_class_found(self, class_name: str, kind: ClassKind) -> None:
+        """
+        Store the class found.
+        """
+        self.graph.add_class(class_name, kind)
+
+    @override
+    def on_relation_found(self, class1: str, class2: str, relation: Relationship) -> None:
+        """
+        Store the relationship found.
+        """
+        self.graph.add_relation(class1, class2, relation)
+
+    @override
+    def on_package_found(self, package_name: str, classes: list) -> None:
+        """
+        Set the package name to the classes.
+        """
+        for class_name in classes:
+            self.graph.set_package(class_name, package_name)
+
+    @override
+    def on_method_found(self, class_name: str, method_name: str, kind: MethodKind) -> None:
+        """
+        Store the method found.
+        """
+        self.graph.add_method(class_name, method_name, kind)
+
+
+class DesignDBMemory(DesignDB):
+    """
+    Class to read the in-memory snapshots.
+    Classes and packages are named with the snapshot as prefix,
+    as in the Neo4j database.
+    It owns the store, that its observer writes and its evaluator reads.
+    """
+
+    def __init__(self, store: Optional[DesignStore] = None) -> None:
+        self.store = DesignStore() if store is None else store
+
+    @override
+    def observer_options(self) -> dict:
+        """
+        The observer writes the snapshots in the store of the database.
+        """
+        return {'store': self.store}
+
+    def _graph(self, mode: Modes) -> SnapshotGraph:
+        """
+        Get the graph of a snapshot.
+        """
+        return self.store.graph(mode)
+
+    @override
+    def get_all_classes(self) -> list[str]:
+        """
+        Gets all classes in the database.
+        """
+        classes = []
+        for mode in Modes:
+            graph = self._graph(mode)
+            classes += [mode.value + graph.names[node_id]
+                        for node_id in graph.classes()]
+        return classes
+
+    @override
+    def get_class_per_package(self, package_name: str) -> list[str]:
+        """
+        Gets all classes in a package.
+        """
+        mode, package_name = split_snapshot(package_name)
+        graph = self._graph(mode)
+        return [mode.value + graph.names[node_id] for node_id in graph.classes()
+                if graph.packages[node_id] == package_name]
+
+    @override
+    def get_methods_per_class(self, class_name: str) -> list[str]:
+        """
+        Gets all methods of a class.
+        """
+        mode, class_name = split_snapshot(class_name)
+        graph = self._graph(mode)
+        node_id = graph.class_id(class_name)
+        if node_id is None:
+            return []
+        return [method_name for method_name, _ in graph.methods[node_id]]
+
+    @override
+    def get_all_relations(self, class_name: str) -> list[RelationshipType]:
+        """
+        Gets all relations of a class.
+        """
+        mode, class_name = split_snapshot(class_name)
+        graph = self._graph(mode)
+        return [RelationshipType(mode.value + graph.names[source],
+                                 mode.value + graph.names[target], relation)
+                for source, target, relation in graph.relations()
+                if graph.names[source] == class_name]
+
+    @override
+    def get_all_packages(self) -> list[str]:
+        """
+        Gets all packages in the database, in the order of their first class.
+        """
+        packages: dict[str, None] = {}
+        for mode in Modes:
+            graph = self._graph(mode)
+            for node_id in graph.classes():
+                if graph.packages[node_id] is not None:
+                    packages[mode.value + graph.packages[node_id]] = None
+        return list(packages)
+
+
+class QueriesMemory(ExprEvaluator):
+    """
+    This class is responsible for calculating the built-in metrics
+    on the in-memory snapshots.
+    The expressions are calls to the native metrics, e.g. classes(before, any).
+    It reads the store of the design database it is set to.
+    """
+
+    def __init__(self) -> None:
+        self.store = DesignStore()
+        # Rows of the grouped metrics by name and arguments, for the current run.
+        self.rows: dict[tuple[str, tuple[str, ...]], dict[str, MetricType]] = {}
+        self.metrics: dict[str, Callable[..., MetricType]] = {
+            'classes': self.classes,
+            'removed_classes': self.removed_classes,
+            'changed_kind': self.changed_kind,
+            'base_class_change': self.base_class_change,
+            'removed_relationships': self.removed_relationships,
+            'changed_relationships': self.changed_relationships,
+            'package_changes': self.package_changes,
+            'methods': self.methods,
+            'removed_methods': self.removed_methods,
+            'private_to_public_methods': self.private_to_public_methods,
+            'hidden_factor_methods': self.hidden_factor_methods
+        }
+        self.grouped_metrics: dict[str, Callable[..., dict[str, MetricType]]] = {
+            'dependencies': self.dependencies,
+            'afferent': self.afferent,
+            'efferent': self.efferent,
+            'instability': self.instability,
+            'package_classes': self.package_classes,
+            'package_efferent': self.package_efferent,
+            'package_afferent': self.package_afferent,
+            'package_instability': self.package_instability
+        }
+
+    @override
+    def set_design_db(self, design_db: DesignDB) -> None:
+        """
+        Read the store of an in-memory design database.
+        """
+        if isinstance(design_db, DesignDBMemory):
+            self.store = design_db.store
+        self.rows = {}
+
+    @override
+    def eval(self,
+             expr: str,
+             arguments: dict[str, str],
+             results: dict[str, str | float]) -> MetricType:    # type: ignore
+        """
+        Evaluate a call to a native metric.
+        The grouped metrics are evaluated for all the classes (or packages)
+        once per run, and the one of the argument is returned.
+        """
+        name, args = self._parse_expr(expr)
+        if name in self.grouped_metrics:
+            rows = self._grouped_rows(name, args)
+            argument = arguments.get('class_name', arguments.get('package_name'))
+            return rows.get(argument, 0)
+        if name not in self.metrics:
+            raise ValueError(f"Metric not allowed: {name}")
+        return self.metrics[name](*args)
+
+    @override
+    def eval_grouped(self,
+                     expr: str,
+                     arguments: dict[str, list[str]],
+                     results: dict[str, str | float]) -> dict[str, MetricType]:    # type: ignore
+        """
+        Evaluate a call to a native metric of all the classes (or packages) at once.
+        """
+        name, args = self._parse_expr(expr)
+        if name not in self.grouped_metrics:
+            raise ValueError(f"Grouped metric not allowed: {name}")
+        return self._grouped_rows(name, args)
+
+    def _grouped_rows(self, name: str, args: list[str]) -> dict[str, MetricType]:
+        """
+        Get the rows of a grouped metric, computed once per run.
+        """
+        key = (name, tuple(args))
+        if key not in self.rows:
+            self.rows[key] = self.grouped_metrics[name](*args)
+        return self.rows[key]
+
+    def _parse_expr(self, expr: str) -> tuple[str, list[str]]:
+        """
+        Split the expression in the name of the metric and its arguments.
+        """
+        match = re.fullmatch(r'\s*(\w+)\s*(?:\((.*)\))?\s*', expr)
+        if match is None:
+            raise ValueError(f"Unsupported expression: {expr}")
+        name, args = match.groups()
+        if not args or not args.strip():
+            return name, []
+        return name, [arg.strip() for arg in args.split(',')]
+
+    def _graph(self, mode: str) -> SnapshotGraph:
+        """
+        Get the graph of a snapshot.
+        """
+        return self.store.graph(Modes(mode))
+
+    def _class_rows(self, values: Callable[[SnapshotGraph], list]) -> dict[str, MetricType]:
+        """
+        Compute a list of values indexed by class id on every snapshot,
+        and index the values of the classes by its name with the snapshot as prefix.
+        """
+        rows: dict[str, MetricType] = {}
+        for mode in Modes:
+            graph = self.store.graph(mode)
+            graph_values = values(graph)
+            for node_id in graph.classes():
+                rows[mode.value + graph.names[node_id]] = graph_values[node_id]
+        return rows
+
+    @staticmethod
+    def _ratio(part: int, total: int) -> float:
+        """
+        Ratio between two counts, 0 if the total is 0.
+        """
+        return 0 if total == 0 else part / total
+
+    # Global metrics
+
+    def classes(self, mode: str, kind: str = 'any') -> int:
+        """
+        Number of classes of a snapshot.
+        """
+        return sum(1 for _ in self._graph(mode).classes(kind))
+
+    def removed_classes(self, mode: str, other: str, kind: str = 'any') -> int:
+        """
+        Number of classes of a snapshot without
+        a class with the same name and kind in the other snapshot.
+        """
+        graph = self._graph(mode)
+        other_graph = self._graph(other)
+        return sum(1 for node_id in graph.classes(kind)
+                   if other_graph.class_id(graph.names[node_id], kind) is None)
+
+    def changed_kind(self, kind_before: str, kind_after: str) -> int:
+        """
+        Number of classes that changed from one kind to another.
+        """
+        before = self._graph(Modes.BEFORE)
+        after = self._graph(Modes.AFTER)
+        return sum(1 for node_id in after.classes(kind_after)
+                   if before.class_id(after.names[node_id], kind_before) is not None)
+
+    def base_class_change(self) -> int:
+        """
+        Number of relationships between classes of both snapshots
+        that were not related before.
+        """
+        before = self._graph(Modes.BEFORE)
+        after = self._graph(Modes.AFTER)
+        before_relations = before.relation_names()
+        count = 0
+        for source, target, _ in after.relations():
+            names = (after.names[source], after.names[target])
+            if (before.class_id(names[0]) is not None
+                    and before.class_id(names[1]) is not None
+                    and names not in before_relations):
+                count += 1
+        return count
+
+    def removed_relationships(self, mode: str, other: str) -> int:
+        """
+        Number of relationships of a snapshot without
+        a relationship between the same classes in the other snapshot.
+        """
+        graph = self._graph(mode)
+        other_relations = self._graph(other).relation_names()
+        return sum(1 for source, target, _ in graph.relations()
+                   if (graph.names[source], graph.names[target]) not in other_relations)
+
+    def changed_relationships(self, relation_before: str, relation_after: str) -> int:
+        """
+        Number of relationships that changed from one type to another.
+        """
+        before_relations = self._graph(Modes.BEFORE).relation_names()
+        after = self._graph(Modes.AFTER)
+        count = 0
+        for source, target, relation in after.relations():
+            if relation.name.lower() != relation_after:
+                continue
+            names = (after.names[source], after.names[target])
+            if any(r.name.lower() == relation_before
+                   for r in before_relations.get(names, ())):
+                count += 1
+        return count
+
+    def package_changes(self) -> int:
+        """
+        Number of classes that changed of package.
+        """
+        before = self._graph(Modes.BEFORE)
+        after = self._graph(Modes.AFTER)
+        count = 0
+        for node_id in after.classes():
+            before_id = before.class_id(after.names[node_id])
+            if before_id is None:
+                continue
+            package_after = after.packages[node_id]
+            package_before = before.packages[before_id]
+            if None not in (package_after, package_before) and package_after != package_before:
+                count += 1
+        return count
+
+    def methods(self, mode: str) -> int:
+        """
+        Number of methods of the classes of a snapshot.
+        """
+        graph = self._graph(mode)
+        return sum(len(graph.methods[node_id]) for node_id in graph.classes())
+
+    def removed_methods(self, mode: str, other: str, visibility: str = 'any') -> int:
+        """
+        Number of methods of a snapshot without a method with the same name
+        in the class with the same name of the other snapshot.
+        """
+        graph = self._graph(mode)
+        other_graph = self._graph(other)
+        count = 0
+        for node_id in graph.classes():
+            other_id = other_graph.class_id(graph.names[node_id])
+            other_methods = set()
+            if other_id is not None:
+                other_methods = {name for name, _ in other_graph.methods[other_id]}
+            count += sum(1 for name, kind in graph.methods[node_id]
+                         if visibility in ('any', kind.value) and name not in other_methods)
+        return count
+
+    def private_to_public_methods(self) -> int:
+        """
+        Number of public methods that were private or protected.
+        """
+        before = self._graph(Modes.BEFORE)
+        after = self._graph(Modes.AFTER)
+        count = 0
+        for node_id in after.classes():
+            before_id = before.class_id(after.names[node_id])
+            if before_id is None:
+                continue
+            hidden = {name for name, kind in before.methods[before_id]
+                      if kind in HIDDEN_METHODS}
+            count += sum(1 for name, kind in after.methods[node_id]
+                         if kind == MethodKind.PUBLIC and name in hidden)
+        return count
+
+    def hidden_factor_methods(self, mode: str) -> float:
+        """
+        Ratio of private and protected methods of the classes of a snapshot,
+        the methods of names that are not classes are not counted.
+        """
+        graph = self._graph(mode)
+        kinds = [kind for node_id in graph.classes() for _, kind in graph.methods[node_id]]
+        hidden = sum(1 for kind in kinds if kind in HIDDEN_METHODS)
+        return self._ratio(hidden, len(kinds))
+
+    # Per-class metrics
+
+    def dependencies(self, kind: str = 'any') -> dict[str, MetricType]:
+        """
+        Number of relationships from each class to classes of a kind.
+        """
+        def values(graph: SnapshotGraph) -> list[int]:
+            counts = [0] * len(graph.names)
+            for source, target, _ in graph.relations():
+                if graph.is_class(target, kind):
+                    counts[source] += 1
+            return counts
+        return self._class_rows(values)
+
+    def afferent(self) -> dict[str, MetricType]:
+        """
+        Number of relationships that arrive to each class.
+        """
+        return self._class_rows(lambda graph: graph.degrees()[1])
+
+    def efferent(self) -> dict[str, MetricType]:
+        """
+        Number of relationships that leave each class.
+        """
+        return self._class_rows(lambda graph: graph.degrees()[0])
+
+    def instability(self) -> dict[str, MetricType]:
+        """
+        Efferent relationships over all the relationships of each class.
+        """
+        def values(graph: SnapshotGraph) -> list[float]:
+            out_degree, in_degree = graph.degrees()
+            return [self._ratio(efferent, efferent + afferent)
+                    for efferent, afferent in zip(out_degree, in_degree)]
+        return self._class_rows(values)
+
+    # Per-package metrics
+
+    def _package_rows(self, values: Callable[[SnapshotGraph], dict[str, int]]
+                      ) -> dict[str, MetricType]:
+        """
+        Compute the values of the packages on every snapshot,
+        and index them by its name with the snapshot as prefix.
+        """
+        rows: dict[str, MetricType] = {}
+        for mode in Modes:
+            for package, value in values(self.store.graph(mode)).items():
+                rows[mode.value + package] = value
+        return rows
+
+    def _external_relations(self, graph: SnapshotGraph) -> tuple[dict[str, int], dict[str, int]]:
+        """
+        Number of relationships that leave and arrive to each package,
+        from or to classes of other packages.
+        """
+        efferent: dict[str, int] = {}
+        afferent: dict[str, int] = {}
+        for source, target, _ in graph.relations():
+            source_package = graph.packages[source]
+            target_package = graph.packages[target]
+            if None in (source_package, target_package) or source_package == target_package:
+                continue
+            efferent[source_package] = efferent.get(source_package, 0) + 1
+            afferent[target_package] = afferent.get(target_package, 0) + 1
+        return efferent, afferent
+
+    def package_classes(self, kind: str = 'any') -> dict[str, MetricType]:
+        """
+        Number of classes of a kind in each package.
+        """
+        def values(graph: SnapshotGraph) -> dict[str, int]:
+            counts: dict[str, int] = {}
+            for node_id in graph.classes(kind):
+                package = graph.packages[node_id]
+                if package is not None:
+                    counts[package] = counts.get(package, 0) + 1
+            return counts
+        return self._package_rows(values)
+
+    def package_efferent(self) -> dict[str, MetricType]:
+        """
+        Number of relationships from each package to other packages.
+        """
+        return self._package_rows(lambda graph: self._external_relations(graph)[0])
+
+    def package_afferent(self) -> dict[str, MetricType]:
+        """
+        Number of relationships from other packages to each package.
+        """
+        return self._package_rows(lambda graph: self._external_relations(graph)[1])
+
+    def package_instability(self) -> dict[str, MetricType]:
+        """
+        Efferent relationships over all the external relationships of each package.
+        """
+        def values(graph: SnapshotGraph) -> dict[str, float]:
+            efferent, afferent = self._external_relations(graph)
+            return {package: self._ratio(efferent.get(package, 0),
+                                         efferent.get(package, 0) + afferent.get(package, 0))
+                    for package in efferent.keys() | afferent.keys()}
+        return self._package_rows(values)
+
+
+def init_module(api: CddeAPI) -> None:
+    """
+    Initialize the module on the API.
+    """
+    api.register_puml_observer('memory', MemoryObserver)
+    api.register_design_db('memory', DesignDBMemory)
+    api.register_expr_evaluator('memory-metrics', QueriesMemory)
@@ -3,6 +3,7 @@ from overrides import override
 from neo4j import Transaction, GraphDatabase
 from src.cdde.design_db import DesignDB, RelationshipType
 from src.cdde.addons_api import CddeAPI
+from src.cdde.puml_observer import split_snapshot
 
 
 class DesignDBNeo4j(DesignDB):
@@ -14,7 +15,6 @@ class DesignDBNeo4j(DesignDB):
         self.uri = self._get_uri()
         self.driver = GraphDatabase.driver(self.uri, auth=None)
         self.path: str = "src/queries/cypher.yml"
-        self.packages: list[str] = []
 
     def _get_uri(self) -> str:
         """
@@ -65,10 +65,12 @@ class DesignDBNeo4j(DesignDB):
         """
         Helper function to get all classes in a package.
         """
+        mode, package_name = split_snapshot(package_name)
         query = """
-                MATCH (c:class {package: $package_name}) RETURN c.name AS name
+                MATCH (c:class {snapshot: $snapshot, package: $package_name})
+                RETURN c.snapshot + c.name AS name
                 """
-        result = tx.run(query, package_name=package_name)
+        result = tx.run(query, snapshot=mode.value, package_name=package_name)
         return [record["name"] for record in result]
 
     def _get_all_classes_(self, tx: Transaction) -> list:
@@ -76,7 +78,7 @@ class DesignDBNeo4j(DesignDB):
         Helper function to get all classes in the database.
         """
         query = """
-                MATCH (c:class) RETURN c.name AS name
+                MATCH (c:class) RETURN c.snapshot + c.name AS name
                 """
         result = tx.run(query)
         return [record["name"] for record in result]
@@ -86,44 +88,36 @@ class DesignDBNeo4j(DesignDB):
         """
         Helper function to get all relations of a class.
         """
+        mode, class_name = split_snapshot(class_name)
         query = """
-                MATCH (c:class {name: $class_name})-[r]->(dependent)
-                RETURN type(r) AS relation, dependent.name AS dependent
+                MATCH (c:class {snapshot: $snapshot, name: $class_name})-[r]->(dependent)
+                RETURN type(r) AS relation, dependent.snapshot + dependent.name AS dependent
                 """
-        result = tx.run(query, class_name=class_name)
+        result = tx.run(query, snapshot=mode.value, class_name=class_name)
         r = []
         for record in result:
             r.append((record["relation"], record["dependent"]))
         return r
 
     @override
-    def set_packages(self, class_name: str) -> None:
+    def get_all_packages(self) -> list[str]:
         """
-        Sets all of the packages in the database.
+        Gets all packages in the database, in one query.
         """
         with self.driver.session() as session:
-            result = session.execute_write(
-                self._set_packages_,  # type: ignore
-                class_name)
-        if result and result not in self.packages:
-            self.packages.append(result)
+            return session.execute_read(
+                self._get_all_packages_)  # type: ignore
 
-    def _set_packages_(self, tx: Transaction, class_name: str) -> None:
+    def _get_all_packages_(self, tx: Transaction) -> list:
         """
         Helper function to get all of the packages in the database.
         """
         query = """
-                MATCH (c:class {name: $class_name})
-                RETURN c.package AS package
+                MATCH (c:class) WHERE c.package IS NOT NULL
+                RETURN DISTINCT c.snapshot + c.package AS package
                 """
-        return tx.run(query, class_name=class_name).single()[0]  # type: ignore
-
-    @override
-    def get_all_packages(self) -> list[str]:
-        """
-        Gets all packages in the database.
-        """
-        return self.packages
+        result = tx.run(query)
+        return [record["package"] for record in result]
 
 
 def init_module(api: CddeAPI) -> None:
@@ -131,3 +125,4 @@ def init_module(api: CddeAPI) -> None:
     Initialize the module on the API.
     """
     api.register_design_db('Neo4j', DesignDBNeo4j)
+    api.register_design_db('Neo4j-batch', DesignDBNeo4j)
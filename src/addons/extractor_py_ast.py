@@ -0,0 +1,362 @@
+"""
+Design extractor for Python files, with the ast module of the standard library.
+The files are read in a process pool, each one gives the facts of its module:
+its imports and its classes, with their bases, methods and attributes.
+The facts are cached by the content of the file, so only the changed files are read again.
+The names are resolved between the modules in the main process,
+and the design is sent to the observer without a PlantUML file.
+"""
+import os
+import sys
+import ast
+import hashlib
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from overrides import override
+from src.cdde.addons_api import CddeAPI
+from src.cdde.cache import FileCache
+from src.cdde.design_extractor import DesignExtractor
+from src.cdde.puml_observer import Observer, ClassKind, Relationship
+from src.cdde.constants import convert_visibility
+
+# Below this number of files, they are read in the main process.
+POOL_MIN_FILES = 64
+
+# Changes when the facts of a module change, so old facts are not reused.
+FACTS_FORMAT = 1
+# The cache holds the facts of one file per entry.
+FACTS_MAX_ENTRIES = 200000
+
+# Relationship of a class with the type of its attributes.
+ATTRIBUTE_RELATIONS = {
+    'composition': Relationship.COMPOSITION,
+    'aggregation': Relationship.AGGREGATION,
+    'association': Relationship.DEPENDENCY
+}
+
+FunctionNode = ast.FunctionDef | ast.AsyncFunctionDef
+
+
+def module_name(directory: str, file: str) -> str:
+    """
+    Get the dotted name of the module of a file, relative to the snapshot.
+    """
+    parts = os.path.splitext(os.path.relpath(file, directory))[0].split(os.sep)
+    if parts[-1] == "__init__":
+        parts = parts[:-1]
+    return ".".join(parts)
+
+
+def dotted_name(node: ast.expr | None) -> str | None:
+    """
+    Get the dotted name of a name or attribute expression,
+    string annotations are parsed. Other expressions have no name.
+    """
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        value = dotted_name(node.value)
+        return None if value is None else f"{value}.{node.attr}"
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        try:
+            return dotted_name(ast.parse(node.value, mode='eval').body)
+        except SyntaxError:
+            return None
+    return None
+
+
+def extract_facts(directory: str, file: str) -> dict | None:
+    """
+    Read the facts of the module of a file.
+    Files that are not valid Python have no facts.
+    """
+    with open(file, 'rb') as source:
+        content = source.read()
+    try:
+        tree = ast.parse(content, filename=file)
+    except (SyntaxError, ValueError):
+        return None
+    module = module_name(directory, file)
+    package = module if file.endswith("__init__.py") else module.rpartition('.')[0]
+    return {'module': module,
+            'imports': _imports(tree, package),
+            'classes': _classes(tree.body, "")}
+
+
+def _imports(tree: ast.Module, package: str) -> dict[str, str]:
+    """
+    Get the names bound by the imports of a module, with the dotted name they refer to.
+    Relative imports are resolved from the package of the module.
+    """
+    imports = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.asname:
+                    imports[alias.asname] = alias.name
+                else:
+                    head = alias.name.split('.')[0]
+                    imports[head] = head
+        elif isinstance(node, ast.ImportFrom):
+            base = node.module or ""
+            if node.level:
+                parts = package.split('.') if package else []
+                parts = parts[:len(parts) - node.level + 1]
+                base = ".".join(parts + ([node.module] if node.module else []))
+            for alias in node.names:
+                if alias.name != '*':
+                    imports[alias.asname or alias.name] = (
+                        f"{base}.{alias.name}" if base else alias.name)
+    return imports
+
+
+def _classes(body: list[ast.stmt], prefix: str) -> list[tuple]:
+    """
+    Get the classes defined in a module or in a class,
+    with the names of their bases, their methods and their attributes.
+    """
+    classes: list[tuple] = []
+    for node in body:
+        if isinstance(node, ast.ClassDef):
+            name = prefix + node.name
+            functions = [child for child in node.body if isinstance(child, FunctionNode)]
+            classes.append((name,
+                            [base for base in map(dotted_name, node.bases) if base],
+                            [function.name for function in functions
+                             if _is_method(function)],
+                            _attributes(node, functions)))
+            classes += _classes(node.body, name + ".")
+    return classes
+
+
+def _is_method(function: FunctionNode) -> bool:
+    """
+    Check if a function of a class is shown as a method by pyreverse:
+    constructors and properties are not.
+    """
+    if function.name == "__init__":
+        return False
+    return not any(dotted_name(decorator) in ("property", "functools.cached_property",
+                                              "cached_property")
+                   or (isinstance(decorator, ast.Attribute) and
+                       decorator.attr in ("setter", "getter", "deleter"))
+                   for decorator in function.decorator_list)
+
+
+def _attributes(node: ast.ClassDef, functions: list[FunctionNode]) -> list[tuple[str, str]]:
+    """
+    Get the types of the attributes of a class and their relationship with the class:
+    composition for instances created by the class, aggregation for instances
+    received as arguments, and association for annotated attributes.
+    """
+    attributes = []
+    for statement in node.body:
+        if isinstance(statement, (ast.Assign, ast.AnnAssign)):
+            attributes.append(_attribute(statement, {}))
+    for function in functions:
+        arguments = function.args.posonlyargs + function.args.args + function.args.kwonlyargs
+        if not arguments:
+            continue
+        annotations = {argument.arg: dotted_name(argument.annotation)
+                       for argument in arguments if argument.annotation}
+        for statement in ast.walk(function):
+            if (isinstance(statement, ast.Assign) and
+                    any(_is_attribute_of(target, arguments[0].arg)
+                        for target in statement.targets)) or \
+                    (isinstance(statement, ast.AnnAssign) and
+                     _is_attribute_of(statement.target, arguments[0].arg)):
+                attributes.append(_attribute(statement, annotations))
+    return list(dict.fromkeys(attribute for attribute in attributes if attribute))
+
+
+def _is_attribute_of(target: ast.expr, instance: str) -> bool:
+    """
+    Check if the target of an assignment is an attribute of the instance.
+    """
+    return (isinstance(target, ast.Attribute) and isinstance(target.value, ast.Name)
+            and target.value.id == instance)
+
+
+def _attribute(statement: ast.Assign | ast.AnnAssign,
+               annotations: dict[str, str | None]) -> tuple[str, str] | None:
+    """
+    Get the type of an assigned attribute and its relationship with the class.
+    """
+    value = statement.value
+    if isinstance(value, ast.Call) and dotted_name(value.func):
+        return 'composition', str(dotted_name(value.func))
+    if isinstance(value, ast.Name) and annotations.get(value.id):
+        return 'aggregation', str(annotations[value.id])
+    if isinstance(statement, ast.AnnAssign) and dotted_name(statement.annotation):
+        return 'association', str(dotted_name(statement.annotation))
+    return None
+
+
+def method_visibility(method_name: str) -> tuple[str, str]:
+    """
+    Split the visibility prefix of a method name, as the PlantUML parser does.
+    """
+    for prefix in ('__', '_'):
+        if method_name.startswith(prefix):
+            return prefix, method_name[len(prefix):]
+    return '', method_name
+
+
+class FactsCache(FileCache):
+    """
+    Cache of the facts of the Python modules, stored as pickles.
+    The key is the path of the file in the snapshot and the hash of its content,
+    so the snapshots of a repository share the facts of their unchanged files.
+    """
+
+    def __init__(self, max_entries: int = FACTS_MAX_ENTRIES) -> None:
+        super().__init__("py-facts", max_entries)
+
+    def key(self, directory: str, file: str) -> str:
+        """
+        Get the key of a file of a snapshot.
+        """
+        with open(file, 'rb') as source:
+            content_hash = hashlib.sha256(source.read()).hexdigest()
+        return self.make_key(FACTS_FORMAT, list(sys.version_info[:2]),
+                             os.path.relpath(file, directory), content_hash)
+
+    def load(self, key: str) -> dict | None:
+        """
+        Load the facts of a file, or None if they are not cached.
+        """
+        data = self.get_bytes(key)
+        if data is None:
+            return None
+        return pickle.loads(data)
+
+    def store(self, facts: dict[str, dict]) -> None:
+        """
+        Store the facts of several files, by their key.
+        """
+        self.put_many({key: pickle.dumps(module, protocol=pickle.HIGHEST_PROTOCOL)
+                       for key, module in facts.items()})
+
+
+class PyAstExtractor(DesignExtractor):
+    """
+    Design extractor for Python files.
+    Classes are named by their module, and methods are filtered, as pyreverse does.
+    Abstract methods keep their name, without the {abstract} mark of the PlantUML files.
+    Bases and attribute types are resolved to the classes of the snapshot,
+    through the imports of each module. Other names are not sent.
+    With a scope, the whole snapshot is read to resolve the names,
+    and only the classes of the scope are sent, with their relationships.
+    """
+    language = "py"
+    source_extensions = ('.py',)
+
+    @override
+    def extract_design(self, directory: str, observer: Observer) -> None:
+        """
+        Read the facts of the modules and send the design to the observer.
+        """
+        files = self.source_files(directory)
+        facts = self._read_facts(directory, files)
+        modules = [module for module in facts if module is not None]
+        scoped = {module['module'] for file, module in zip(files, facts)
+                  if module is not None and self.in_scope(directory, file)}
+        observer.open_observer()
+        self._send_design(modules, scoped, observer)
+        observer.close_observer()
+
+    def _read_facts(self, directory: str, files: list[str]) -> list[dict | None]:
+        """
+        Get the facts of the source files from the cache,
+        only the files that are not in it are read.
+        Files that are not valid Python are not cached.
+        """
+        if not self.use_cache:
+            return self._extract_facts(directory, files)
+        cache = FactsCache()
+        keys = [cache.key(directory, file) for file in files]
+        facts = [cache.load(key) for key in keys]
+        missing = [index for index, module in enumerate(facts) if module is None]
+        extracted = self._extract_facts(directory, [files[index] for index in missing])
+        for index, module in zip(missing, extracted):
+            facts[index] = module
+        cache.store({keys[index]: facts[index] for index in missing
+                     if facts[index] is not None})
+        return facts
+
+    def _extract_facts(self, directory: str, files: list[str]) -> list[dict | None]:
+        """
+        Read the facts of the files, in a process pool if there are many.
+        """
+        if len(files) < POOL_MIN_FILES:
+            return [extract_facts(directory, file) for file in files]
+        with ProcessPoolExecutor() as executor:
+            chunksize = max(1, len(files) // (4 * (os.cpu_count() or 1)))
+            return list(executor.map(extract_facts, [directory] * len(files), files,
+                                     chunksize=chunksize))
+
+    def _send_design(self, modules: list[dict], scoped: set[str],
+                     observer: Observer) -> None:
+        """
+        Send the classes of the scoped modules and their methods,
+        and then their relationships.
+        """
+        classes: dict[str, tuple[dict, tuple]] = {}
+        by_name: dict[str, list[str]] = {}
+        for module in modules:
+            for class_facts in module['classes']:
+                qualified = self._qualify(module['module'], class_facts[0])
+                classes[qualified] = (module, class_facts)
+                by_name.setdefault(qualified.rsplit('.', 1)[-1], []).append(qualified)
+
+        classes_in_scope = {qualified: facts for qualified, facts in classes.items()
+                            if facts[0]['module'] in scoped}
+        for qualified, (_, (_, _, methods, _)) in classes_in_scope.items():
+            observer.on_class_found(qualified, ClassKind.CLASS)
+            for method in methods:
+                kind, method_name = method_visibility(method)
+                observer.on_method_found(qualified, method_name, convert_visibility(kind))
+
+        for qualified, (module, (_, bases, _, attributes)) in classes_in_scope.items():
+            for base in bases:
+                parent = self._resolve(module, base, classes, by_name)
+                if parent is not None:
+                    observer.on_relation_found(parent, qualified, Relationship.INHERITANCE)
+            for relation, type_name in attributes:
+                target = self._resolve(module, type_name, classes, by_name)
+                if target is not None:
+                    observer.on_relation_found(qualified, target,
+                                               ATTRIBUTE_RELATIONS[relation])
+
+    def _qualify(self, module: str, name: str) -> str:
+        """
+        Get the name of a class qualified by its module.
+        """
+        return f"{module}.{name}" if module else name
+
+    def _resolve(self, module: dict, name: str, classes: dict,
+                 by_name: dict[str, list[str]]) -> str | None:
+        """
+        Resolve a name used in a module to a class of the snapshot.
+        Imported names that are not found where they are imported from,
+        as the names exported by a package, are matched by their class name
+        if only one class of the snapshot has it.
+        """
+        local = self._qualify(module['module'], name)
+        if local in classes:
+            return local
+        head, _, rest = name.partition('.')
+        if head not in module['imports']:
+            return None
+        imported = module['imports'][head] + ('.' + rest if rest else '')
+        if imported in classes:
+            return imported
+        candidates = by_name.get(imported.rsplit('.', 1)[-1], [])
+        return candidates[0] if len(candidates) == 1 else None
+
+
+def init_module(api: CddeAPI) -> None:
+    """
+    Initialize the module on the API.
+    """
+    api.register_design_extractor('py-ast', PyAstExtractor)
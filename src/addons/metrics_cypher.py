@@ -5,6 +5,7 @@ from neo4j import GraphDatabase
 from overrides import override
 from src.cdde.expr_evaluator import ExprEvaluator, MetricType
 from src.cdde.addons_api import CddeAPI
+from src.cdde.puml_observer import split_snapshot
 
 
 class QueriesCypher(ExprEvaluator):
@@ -37,6 +38,7 @@ class QueriesCypher(ExprEvaluator):
         Set the result in the results dictionary.
         Send the result to the observer.
         """
+        arguments = self._snapshot_arguments(arguments)
         with self.driver.session() as session:
             record = session.execute_read(
                 lambda tx: tx.run(expr, **arguments).single()
@@ -46,6 +48,37 @@ class QueriesCypher(ExprEvaluator):
         value = record[0]
         return 0 if value is None else value  # type: ignore
 
+    def _snapshot_arguments(self, arguments: dict) -> dict:
+        """
+        Add the snapshot and the bare name of the class_name
+        or package_name arguments, as they are stored in the database.
+        """
+        arguments = dict(arguments)
+        if 'class_name' in arguments:
+            mode, arguments['name'] = split_snapshot(arguments['class_name'])
+            arguments['snapshot'] = mode.value
+        if 'package_name' in arguments:
+            mode, arguments['package'] = split_snapshot(arguments['package_name'])
+            arguments['snapshot'] = mode.value
+        return arguments
+
+    @override
+    def eval_grouped(self,
+                     expr: str,
+                     arguments: dict,  # type: ignore
+                     results: dict) -> dict[str, MetricType]:  # type: ignore
+        """
+        Run a query that returns one row per class (or package),
+        the first column is its name and the second one the metric.
+        The query finds the classes (or packages) itself, so the names are not sent.
+        """
+        with self.driver.session() as session:
+            records = session.execute_read(
+                lambda tx: list(tx.run(expr))
+            )
+        return {record[0]: 0 if record[1] is None else record[1]
+                for record in records}
+
 
 def init_module(api: CddeAPI) -> None:
     """
@@ -1,13 +1,114 @@
 """
 This module contains the Filter class,
 this class is an intermediate Observer that filters the information it receives.
+The events are kept in compact records until the observer is closed,
+the names in the records are interned so repeated names share one string.
+Each distinct name is normalized only once, through tables shared by the filters.
+The streaming filter sends the events as soon as their classes are known.
 """
 import re
-from typing import Final
+import sys
+from typing import Final, Callable
 from overrides import override
 from src.cdde.addons_api import CddeAPI
 from src.cdde.puml_observer import Observer, Modes, ClassKind, Relationship, MethodKind
 
+SPECIAL_CHARACTERS = re.compile(r'[^A-Za-z0-9\s]')
+METHOD_SPECIAL_CHARACTERS = re.compile(r'[^A-Za-z0-9_\s]')
+
+
+def delete_before_last_dot(name: str) -> str:
+    """
+    Delete the namespace or package of a name, the string before the last dot.
+    """
+    return name.rsplit('.', 1)[-1]
+
+
+def normalize_class_name(name: str) -> str:
+    """
+    Delete the namespace or package and the special characters of a class name.
+    """
+    return SPECIAL_CHARACTERS.sub('', delete_before_last_dot(name))
+
+
+def normalize_method_name(name: str) -> str:
+    """
+    Delete the special characters of a method name.
+    """
+    return METHOD_SPECIAL_CHARACTERS.sub('', name)
+
+
+class NormalizedNames(dict):
+    """
+    Table of the normalized names by raw name,
+    a name is normalized the first time it is looked up.
+    """
+
+    def __init__(self, normalize: Callable[[str], str]) -> None:
+        super().__init__()
+        self.normalize = normalize
+
+    def __missing__(self, name: str) -> str:
+        normalized = self[name] = sys.intern(self.normalize(name))
+        return normalized
+
+
+class Names:
+    """
+    Tables of the normalized names of a snapshot.
+    """
+
+    def __init__(self) -> None:
+        self.classes = NormalizedNames(normalize_class_name)
+        self.methods = NormalizedNames(normalize_method_name)
+        self.method_classes = NormalizedNames(delete_before_last_dot)
+
+
+class ClassRecord:
+    """
+    Class found.
+    """
+    __slots__ = ('name', 'kind')
+
+    def __init__(self, name: str, kind: ClassKind) -> None:
+        self.name = name
+        self.kind = kind
+
+
+class RelationRecord:
+    """
+    Relationship found.
+    """
+    __slots__ = ('class1', 'class2', 'relation')
+
+    def __init__(self, class1: str, class2: str, relation: Relationship) -> None:
+        self.class1 = class1
+        self.class2 = class2
+        self.relation = relation
+
+
+class PackageRecord:
+    """
+    Package found, with the names of its classes.
+    """
+    __slots__ = ('name', 'classes')
+
+    def __init__(self, name: str, classes: list[str]) -> None:
+        self.name = name
+        self.classes = classes
+
+
+class MethodRecord:
+    """
+    Method found.
+    """
+    __slots__ = ('class_name', 'name', 'kind')
+
+    def __init__(self, class_name: str, name: str, kind: MethodKind) -> None:
+        self.class_name = class_name
+        self.name = name
+        self.kind = kind
+
 
 class Filter(Observer):
     """
@@ -17,13 +118,14 @@ class Filter(Observer):
     and calls their corresponding methods to filter what is necessary.
     """
 
-    def __init__(self, observer_to_send: Observer,
-                 classes=None, relationships=None, packages=None, methods=None) -> None:
+    def __init__(self, observer_to_send: Observer, classes=None, relationships=None,
+                 packages=None, methods=None, names: Names | None = None) -> None:
         self.observer_to_send: Final = observer_to_send
-        self.classes: list = self._default_list(classes)
-        self.relationships: list = self._default_list(relationships)
-        self.packages: list = self._default_list(packages)
-        self.methods: list = self._default_list(methods)
+        self.names = names if names is not None else Names()
+        self.classes: list[ClassRecord] = self._default_list(classes)
+        self.relationships: list[RelationRecord] = self._default_list(relationships)
+        self.packages: list[PackageRecord] = self._default_list(packages)
+        self.methods: list[MethodRecord] = self._default_list(methods)
 
     @staticmethod
     def _default_list(value):
@@ -50,12 +152,12 @@ class Filter(Observer):
         Event triggered when the observer is closed.
         """
         class_filter = ClassFilter(
-            self.classes, self.observer_to_send)
+            self.classes, self.observer_to_send, self.names)
         relationship_filter = RelationshipFilter(
-            self.relationships, self.observer_to_send)
+            self.relationships, self.observer_to_send, self.names)
         package_filter = PackageFilter(
-            self.packages, self.observer_to_send)
-        method_filter = MethodsFilter(self.methods, self.observer_to_send)
+            self.packages, self.observer_to_send, self.names)
+        method_filter = MethodsFilter(self.methods, self.observer_to_send, self.names)
 
         # Filter the information
         class_filter.filter()
@@ -75,30 +177,33 @@ class Filter(Observer):
     @override
     def on_class_found(self, class_name: str, kind: ClassKind) -> None:
         """
-        Create a list with the class found.
+        Record the class found.
         """
-        self.classes.append([class_name, kind])
+        self.classes.append(ClassRecord(sys.intern(class_name), kind))
 
     @override
     def on_relation_found(self, class1: str, class2: str, relation: Relationship) -> None:
         """
-        Create a list with the relationship found.
+        Record the relationship found.
         """
-        self.relationships.append([class1, class2, relation])
+        self.relationships.append(
+            RelationRecord(sys.intern(class1), sys.intern(class2), relation))
 
     @override
     def on_package_found(self, package_name: str, classes: list) -> None:
         """
-        Create a list with the package found.
+        Record the package found.
         """
-        self.packages.append([package_name, classes])
+        self.packages.append(PackageRecord(
+            sys.intern(package_name), [sys.intern(class_name) for class_name in classes]))
 
     @override
     def on_method_found(self, class_name: str, method_name: str, kind: MethodKind) -> None:
         """
-        Create a list with the method found.
+        Record the method found.
         """
-        self.methods.append([class_name, method_name, kind])
+        self.methods.append(
+            MethodRecord(sys.intern(class_name), sys.intern(method_name), kind))
 
 
 class ClassFilter(Filter):
@@ -106,63 +211,33 @@ class ClassFilter(Filter):
     Filter the classes.
     """
 
-    def __init__(self, classes: list, observer_to_send: Observer) -> None:
-        super().__init__(observer_to_send, classes=classes)
+    def __init__(self, classes: list[ClassRecord], observer_to_send: Observer,
+                 names: Names | None = None) -> None:
+        super().__init__(observer_to_send, classes=classes, names=names)
 
     def filter(self) -> None:
         """
-        Filter the classes:
-        - Removing duplicates.
-        - If any class perteneces to a namespace or package, 
+        Filter the classes in one pass:
+        - If any class perteneces to a namespace or package,
         the namespace or package is removed from the class name.
         - Removing special characters of the class names.
-        """
-        self._delete_ns_or_pkg()
-        self._remove_special_characters()
-        self._remove_duplicates()
-
-    def _delete_ns_or_pkg(self) -> None:
-        """
-        Delete the namespace or package of the class names.
-        """
-        for i, c in enumerate(self.classes):
-            class_name, _ = c
-            self.classes[i][0] = self.__delete_before_last_dot(class_name)
-
-    def __delete_before_last_dot(self, class_name: str) -> str:
-        """
-        Delete the string before the last dot.
-        """
-        return class_name.split('.')[-1] if '.' in class_name else class_name
-
-    def _remove_special_characters(self) -> None:
-        """
-        Remove special characters from the class name.
-        """
-        for i, c in enumerate(self.classes):
-            self.classes[i][0] = re.sub(r'[^A-Za-z0-9\s]', '', c[0])
-
-    def _remove_duplicates(self) -> None:
-        """
-        Remove duplicate class names, keeping only the first occurrence.
+        - Removing duplicates, keeping only the first occurrence.
         """
         seen = set()
         filtered_classes = []
-
-        for class_name, kind in self.classes:
-            if class_name not in seen:
-                seen.add(class_name)
-                filtered_classes.append([class_name, kind])
-
+        for record in self.classes:
+            record.name = self.names.classes[record.name]
+            if record.name not in seen:
+                seen.add(record.name)
+                filtered_classes.append(record)
         self.classes = filtered_classes
 
     def send(self) -> None:
         """
         Send the filtered classes to the next observer.
         """
-        for classes in self.classes:
-            class_name, kind = classes
-            self.observer_to_send.on_class_found(class_name, kind)
+        for record in self.classes:
+            self.observer_to_send.on_class_found(record.name, record.kind)
 
 
 class RelationshipFilter(Filter):
@@ -170,52 +245,28 @@ class RelationshipFilter(Filter):
     Class that filters the relationships.
     """
 
-    def __init__(self, relationships: list, observer_to_send: Observer) -> None:
-        super().__init__(observer_to_send, relationships=relationships)
+    def __init__(self, relationships: list[RelationRecord],
+                 observer_to_send: Observer, names: Names | None = None) -> None:
+        super().__init__(observer_to_send, relationships=relationships, names=names)
 
     def filter(self) -> None:
         """
         Filter the relationships
-        - If any class perteneces to a namespace or package, 
+        - If any class perteneces to a namespace or package,
         the namespace or package is removed from the class name.
         - Removing special characters of the class names.
         """
-        self._delete_ns_or_pkg()
-        self._remove_special_characters()
-
-    def _delete_ns_or_pkg(self) -> None:
-        """
-        Delete the namespace or package of the class names.
-        """
-        for i, relation in enumerate(self.relationships):
-            class1, class2, _ = relation
-            self.relationships[i][0] = self.__delete_before_last_dot(class1)
-            self.relationships[i][1] = self.__delete_before_last_dot(class2)
-
-    def __delete_before_last_dot(self, class_name: str) -> str:
-        """
-        Delete the string before the last dot.
-        """
-        return class_name.split('.')[-1] if '.' in class_name else class_name
-
-    def _remove_special_characters(self) -> None:
-        """
-        Remove special characters from the class name.
-        """
-        for i, relation in enumerate(self.relationships):
-            self.relationships[i][0] = re.sub(
-                r'[^A-Za-z0-9\s]', '', relation[0])
-            self.relationships[i][1] = re.sub(
-                r'[^A-Za-z0-9\s]', '', relation[1])
+        for record in self.relationships:
+            record.class1 = self.names.classes[record.class1]
+            record.class2 = self.names.classes[record.class2]
 
     def send(self) -> None:
         """
         Send the filtered relationships to the next observer.
         """
-        for relationship in self.relationships:
-            class1, class2, relation = relationship
+        for record in self.relationships:
             self.observer_to_send.on_relation_found(
-                class1, class2, relation)
+                record.class1, record.class2, record.relation)
 
 
 class PackageFilter(Filter):
@@ -223,103 +274,168 @@ class PackageFilter(Filter):
     Class that filters the packages.
     """
 
-    def __init__(self, packages: list, observer_to_send: Observer) -> None:
-        super().__init__(observer_to_send, packages=packages)
+    def __init__(self, packages: list[PackageRecord], observer_to_send: Observer,
+                 names: Names | None = None) -> None:
+        super().__init__(observer_to_send, packages=packages, names=names)
 
     def filter(self) -> None:
         """
-        Filter the classes in the packages.
+        Filter the classes in the packages, normalizing their names
+        and removing duplicates in the same pass.
         """
-        self._delete_ns_or_pkg()
-        self._remove_special_characters()
-        self._remove_duplicates()
+        for record in self.packages:
+            record.classes = list(dict.fromkeys(
+                self.names.classes[class_name] for class_name in record.classes))
 
-    def _delete_ns_or_pkg(self) -> None:
+    def send(self) -> None:
         """
-        Delete the namespace or package of the class names.
+        Send the filtered packages to the next observer.
         """
-        for i, package in enumerate(self.packages):
-            _, classes = package
-            for j, c in enumerate(classes):
-                self.packages[i][1][j] = self.__delete_before_last_dot(c)
+        for record in self.packages:
+            self.observer_to_send.on_package_found(
+                record.name, record.classes)
 
-    def __delete_before_last_dot(self, class_name: str) -> str:
-        """
-        Delete the string before the last dot.
-        """
-        return class_name.split('.')[-1] if '.' in class_name else class_name
 
-    def _remove_special_characters(self) -> None:
-        """
-        Remove special characters from the class name.
-        """
-        for i, package in enumerate(self.packages):
-            for j, c in enumerate(package[1]):
-                self.packages[i][1][j] = re.sub(r'[^A-Za-z0-9\s]', '', c)
+class MethodsFilter(Filter):
+    """
+    Filter the Methods.
+    """
 
-    def _remove_duplicates(self) -> None:
+    def __init__(self, methods: list[MethodRecord], observer_to_send: Observer,
+                 names: Names | None = None) -> None:
+        super().__init__(observer_to_send, methods=methods, names=names)
+
+    def filter(self) -> None:
         """
-        Remove duplicate class names, keeping only the first occurrence.
+        Filter the methods:
+        - Removing special characters of the methods names.
+        - Removing the namespace or package of their class names.
         """
-        for i, package in enumerate(self.packages):
-            _, classes = package
-            filtered_classes = self.__list_without_duplicates(classes)
-            self.packages[i][1] = filtered_classes
+        for record in self.methods:
+            record.name = self.names.methods[record.name]
+            record.class_name = self.names.method_classes[record.class_name]
 
-    def __list_without_duplicates(self, classes: list) -> list:
+    def send(self) -> None:
         """
-        Remove duplicate class names, keeping only the first occurrence.
+        Send the filtered methods to the next observer.
         """
-        seen = set()
-        filtered_classes = []
+        for record in self.methods:
+            self.observer_to_send.on_method_found(
+                record.class_name, record.name, record.kind)
 
-        for class_name in classes:
-            if class_name not in seen:
-                seen.add(class_name)
-                filtered_classes.append(class_name)
 
-        return filtered_classes
+class Waiting:
+    """
+    Event kept by the streaming filter until its classes are sent.
+    """
+    __slots__ = ('record', 'missing')
 
-    def send(self) -> None:
-        """
-        Send the filtered packages to the next observer.
-        """
-        for package in self.packages:
-            package_name, classes = package
-            self.observer_to_send.on_package_found(
-                package_name, classes)
+    def __init__(self, record: RelationRecord | PackageRecord | MethodRecord,
+                 missing: int) -> None:
+        self.record = record
+        self.missing = missing
 
 
-class MethodsFilter(Filter):
+class StreamingFilter(Filter):
     """
-    Filter the Methods.
+    Filter that sends the events as they are found,
+    instead of keeping the whole snapshot until the observer is closed.
+    A class is sent the first time its normalized name is found.
+    Relationships, packages and methods are sent once their classes are sent,
+    as the stores expect. The ones with classes not found yet wait for them,
+    and the rest are sent when the observer is closed, as the Filter does.
     """
 
-    def __init__(self, methods: list, observer_to_send: Observer) -> None:
-        super().__init__(observer_to_send, methods=methods)
+    def __init__(self, observer_to_send: Observer, names: Names | None = None) -> None:
+        super().__init__(observer_to_send, names=names)
+        self.sent: set[str] = set()
+        self.waiting: dict[str, list[Waiting]] = {}
+        # The events still waiting, in the order they were found.
+        self.deferred: dict[Waiting, None] = {}
 
-    def filter(self) -> None:
+    @override
+    def close_observer(self) -> None:
         """
-        Filter the methods:
-        - Removing special characters of the methods names.
+        Send the events whose classes were not found, and close the observer.
         """
-        self._remove_special_characters()
+        for record_type in (RelationRecord, PackageRecord, MethodRecord):
+            for waiting in self.deferred:
+                if isinstance(waiting.record, record_type):
+                    self._send(waiting.record)
+        self.waiting = {}
+        self.deferred = {}
+        self.observer_to_send.close_observer()
 
-    def _remove_special_characters(self) -> None:
+    @override
+    def on_class_found(self, class_name: str, kind: ClassKind) -> None:
         """
-        Remove special characters from the methods name.
+        Send the class the first time it is found,
+        and the events that were waiting for it.
         """
-        for i, method in enumerate(self.methods):
-            self.methods[i][1] = re.sub(r'[^A-Za-z0-9_\s]', '', method[1])
+        class_name = self.names.classes[class_name]
+        if class_name in self.sent:
+            return
+        self.sent.add(class_name)
+        self.observer_to_send.on_class_found(class_name, kind)
+        for waiting in self.waiting.pop(class_name, []):
+            waiting.missing -= 1
+            if waiting.missing == 0:
+                del self.deferred[waiting]
+                self._send(waiting.record)
 
-    def send(self) -> None:
+    @override
+    def on_relation_found(self, class1: str, class2: str, relation: Relationship) -> None:
         """
-        Send the filtered methods to the next observer.
+        Send the relationship once both classes are sent.
         """
-        for method in self.methods:
-            class_name, method_name, kind = method
-            class_name = class_name.split('.')[-1] if '.' in class_name else class_name
-            self.observer_to_send.on_method_found(class_name, method_name, kind)
+        record = RelationRecord(self.names.classes[class1],
+                                self.names.classes[class2], relation)
+        self._send_or_wait(record, {record.class1, record.class2})
+
+    @override
+    def on_package_found(self, package_name: str, classes: list) -> None:
+        """
+        Send the package once its classes are sent.
+        """
+        record = PackageRecord(sys.intern(package_name), list(dict.fromkeys(
+            self.names.classes[class_name] for class_name in classes)))
+        self._send_or_wait(record, set(record.classes))
+
+    @override
+    def on_method_found(self, class_name: str, method_name: str, kind: MethodKind) -> None:
+        """
+        Send the method once its class is sent.
+        """
+        record = MethodRecord(self.names.method_classes[class_name],
+                              self.names.methods[method_name], kind)
+        self._send_or_wait(record, {record.class_name})
+
+    def _send_or_wait(self, record: RelationRecord | PackageRecord | MethodRecord,
+                      classes: set[str]) -> None:
+        """
+        Send the event if its classes are sent, or keep it until they are.
+        """
+        missing = classes - self.sent
+        if not missing:
+            self._send(record)
+            return
+        waiting = Waiting(record, len(missing))
+        self.deferred[waiting] = None
+        for class_name in missing:
+            self.waiting.setdefault(class_name, []).append(waiting)
+
+    def _send(self, record: RelationRecord | PackageRecord | MethodRecord) -> None:
+        """
+        Send the event of a record to the next observer.
+        """
+        if isinstance(record, RelationRecord):
+            self.observer_to_send.on_relation_found(
+                record.class1, record.class2, record.relation)
+        elif isinstance(record, PackageRecord):
+            self.observer_to_send.on_package_found(record.name, record.classes)
+        else:
+            self.observer_to_send.on_method_found(
+                record.class_name, record.name, record.kind)
 
 
 def init_module(api: CddeAPI) -> None:
@@ -327,3 +443,4 @@ def init_module(api: CddeAPI) -> None:
     Initialize the module on the API.
     """
     api.register_puml_observer('filter', Filter)
+    api.register_puml_observer('filter-streaming', StreamingFilter)
@@ -1,11 +1,49 @@
 """
 This module handles the creation of a Neo4j database.
 """
+from typing import Iterator
 from overrides import override
 from neo4j import GraphDatabase, Transaction
 from src.cdde.addons_api import CddeAPI
 from src.cdde.puml_observer import Observer, Modes, ClassKind, Relationship, MethodKind
 
+BATCH_SIZE = 5000
+FLUSH_SIZE = 50000
+
+INDEXES = [
+    "CREATE INDEX class_snapshot_name IF NOT EXISTS "
+    "FOR (c:class) ON (c.snapshot, c.name)",
+    "CREATE INDEX class_snapshot_package IF NOT EXISTS "
+    "FOR (c:class) ON (c.snapshot, c.package)",
+    "CREATE INDEX method_snapshot_name IF NOT EXISTS "
+    "FOR (m:method) ON (m.snapshot, m.name)",
+    "CREATE INDEX library_snapshot_name IF NOT EXISTS "
+    "FOR (l:library) ON (l.snapshot, l.name)"
+]
+
+# Labels of the nodes that belong to a snapshot.
+SNAPSHOT_LABELS = ["class", "method", "library"]
+
+# Creates the methods of a class, linked to the class that owns them.
+# The methods of a name that is not a class of the snapshot are not created,
+# before they were created without their HAS_METHOD relationship.
+METHODS_QUERY = (
+    "MATCH (a:class {snapshot: $snapshot, name: $class_name}) "
+    "UNWIND $methods AS m "
+    "CREATE (a)-[:HAS_METHOD]->"
+    "(:method {name: m.name, snapshot: $snapshot, visibility: m.visibility})"
+)
+
+# Creates a library node for each name that is not a class of the snapshot.
+LIBRARY_QUERY = (
+    "UNWIND $names AS name "
+    "OPTIONAL MATCH (c:class {snapshot: $snapshot, name: name}) "
+    "WITH name, c "
+    "WHERE c IS NULL "
+    "MERGE (l:library {snapshot: $snapshot, name: name}) "
+    "ON CREATE SET l.package = 'library'"
+)
+
 
 class Neo4j(Observer):
     """
@@ -17,6 +55,8 @@ class Neo4j(Observer):
         self.driver = GraphDatabase.driver(
             self.uri, auth=None)
         self.mode: Modes
+        self.method_class: str | None = None
+        self.class_methods: list[dict] = []
 
     def _get_uri(self) -> str:
         """
@@ -28,69 +68,77 @@ class Neo4j(Observer):
         except:
             return "bolt://localhost:7689"
 
+    def _create_indexes(self) -> None:
+        """
+        Create the indexes of the snapshot and the names of the nodes,
+        used by the queries to look up a class in the other snapshot.
+        They are created when the database is cleaned, before the snapshots are written,
+        so the observers of both snapshots do not change the schema concurrently.
+        """
+        with self.driver.session() as session:
+            for index in INDEXES:
+                session.run(index)
+
     def _create_class(self, tx: Transaction, name: str, kind: ClassKind) -> None:
         """
         Query to create a node with the class name.
         """
-        name = self.mode.value + name
         tx.run(
-            f"CREATE (p:class {{name: $name, type: $type}})",  # pylint: disable=f-string-without-interpolation
-            name=name, type=kind.value)
+            "CREATE (p:class {name: $name, snapshot: $snapshot, type: $type})",
+            name=name, snapshot=self.mode.value, type=kind.value)
 
     def _create_relation(self, tx: Transaction, class1: str, class2:
                          str, relation: Relationship) -> None:
         """
         Query to create a relationship between two nodes.
-        If the nodes do not exist, they are created, 
+        If the classes do not exist, library nodes are created,
         with the package attribute set to 'library'.
         """
-        class1 = self.mode.value + class1
-        class2 = self.mode.value + class2
-        mode = self.mode.value + '_'
         query = (
-            f"MATCH (a:class), (b:class) "
-            f"WHERE a.name = $class1 AND b.name = $class2 "
+            "MATCH (a:class {snapshot: $snapshot, name: $class1}), "
+            "(b:class {snapshot: $snapshot, name: $class2}) "
             f"CREATE (a)-[r:{relation.name}] -> (b)"
         )
-        query_check_or_create_a = (
-            "MERGE (a {name: $class1}) "
-            f"ON CREATE SET a.package = ('{mode}' + 'library')"
-            "RETURN a"
-        )
+        tx.run(LIBRARY_QUERY, snapshot=self.mode.value, names=[class1, class2])
+        tx.run(query, snapshot=self.mode.value, class1=class1, class2=class2)
 
-        query_check_or_create_b = (
-            "MERGE (b {name: $class2})"
-            f"ON CREATE SET b.package = ('{mode}' + 'library')"
-            "RETURN b"
-        )
-        tx.run(query_check_or_create_a, class1=class1)
-        tx.run(query_check_or_create_b, class2=class2)
-        tx.run(query, class1=class1, class2=class2)
+    def _create_methods(self, tx: Transaction, class_name: str,
+                        methods: list[dict]) -> None:
+        """
+        Query to create the method nodes of a class.
+        """
+        tx.run(METHODS_QUERY, snapshot=self.mode.value,
+               class_name=class_name, methods=methods)
 
-    def _create_method(self, tx: Transaction, class_name: str,
-                       method_name: str, kind: MethodKind) -> None:
+    def _flush_methods(self) -> None:
         """
-        Query to create a node with the method name.
+        Write the methods buffered for the current class.
         """
-        class_name = self.mode.value + class_name
-        method_name = self.mode.value + method_name
-        tx.run(
-            f"CREATE (p:method {{name: $method_name, visibility: $kind}})",  # pylint: disable=f-string-without-interpolation
-            method_name=method_name, kind=kind.value)
-        tx.run(
-            f"""
-            MATCH (a:class), (p:method)
-            WHERE p.name = $method_name
-            AND a.name = $class_name
-            CREATE (a)-[:HAS_METHOD]->(p)
-            """, class_name=class_name, method_name=method_name)
+        if self.method_class is not None and self.class_methods:
+            with self.driver.session() as session:
+                session.execute_write(self._create_methods,  # type: ignore
+                                      self.method_class, self.class_methods)
+        self.method_class = None
+        self.class_methods = []
 
     def delete_all(self) -> None:
         """
-        Delete all nodes and relationships in the database.
+        Delete all nodes and relationships in the database,
+        and create its indexes if they do not exist.
         """
         with self.driver.session() as session:
             session.run("MATCH (n) DETACH DELETE n")
+        self._create_indexes()
+
+    def shift_snapshots(self) -> None:
+        """
+        Delete the before snapshot and relabel the after snapshot as before.
+        """
+        with self.driver.session() as session:
+            for label in SNAPSHOT_LABELS:
+                session.run(f"MATCH (n:{label} {{snapshot: 'before'}}) DETACH DELETE n")
+            for label in SNAPSHOT_LABELS:
+                session.run(f"MATCH (n:{label} {{snapshot: 'after'}}) SET n.snapshot = 'before'")
 
     def close(self):
         """
@@ -103,6 +151,7 @@ class Neo4j(Observer):
         """
         Set the mode of the observer.
         """
+        self._flush_methods()
         self.mode = mode
 
     @override
@@ -116,6 +165,7 @@ class Neo4j(Observer):
         """
         Event triggered when the observer is closed.
         """
+        self._flush_methods()
         self.close()
 
     @override
@@ -141,26 +191,188 @@ class Neo4j(Observer):
         """
         Set the package name to the classes.
         """
-        package_name = self.mode.value + package_name
         with self.driver.session() as session:
             for class_name in classes:
-                class_name = self.mode.value + class_name
                 query = (
-                    "MATCH (a) "
-                    "WHERE a.name = $class_name "
+                    "MATCH (a:class {snapshot: $snapshot, name: $class_name}) "
                     "SET a.package = $package_name"
                 )
-                session.run(query, class_name=class_name,
-                            package_name=package_name)
+                session.run(query, snapshot=self.mode.value,
+                            class_name=class_name, package_name=package_name)
 
     @override
     def on_method_found(self, class_name: str, method_name: str, kind: MethodKind) -> None:
         """
-        Create a node with the method name.
+        Buffer the method found, the methods of a class are
+        created together when the parser moves to another class.
+        """
+        if class_name != self.method_class:
+            self._flush_methods()
+            self.method_class = class_name
+        self.class_methods.append({'name': method_name,
+                                   'visibility': kind.value})
+
+
+class Neo4jBatch(Neo4j):
+    """
+    Neo4j observer that buffers the events it receives
+    and writes them with UNWIND queries when flush_size rows are buffered
+    and when the observer is closed.
+    The filters send the relationships, packages and methods after their classes,
+    so a flush never writes them before the classes they match.
+    """
+
+    def __init__(self, batch_size: int = BATCH_SIZE, flush_size: int = FLUSH_SIZE) -> None:
+        super().__init__()
+        self.batch_size = batch_size
+        self.flush_size = flush_size
+        self.buffered = 0
+        self.classes: list[dict] = []
+        self.methods: dict[str, list[dict]] = {}
+        self.relations: dict[Relationship, list[dict]] = {}
+        self.packages: list[dict] = []
+
+    def _chunks(self, rows: list[dict]) -> Iterator[list[dict]]:
+        """
+        Split the rows in chunks of batch_size.
+        """
+        for i in range(0, len(rows), self.batch_size):
+            yield rows[i:i + self.batch_size]
+
+    def _create_classes(self, tx: Transaction, rows: list[dict]) -> None:
+        """
+        Query to create the class nodes.
+        """
+        query = (
+            "UNWIND $rows AS row "
+            "CREATE (:class {name: row.name, snapshot: $snapshot, type: row.type})"
+        )
+        for chunk in self._chunks(rows):
+            tx.run(query, rows=chunk, snapshot=self.mode.value)
+
+    def _create_class_methods(self, tx: Transaction, rows: list[dict]) -> None:
+        """
+        Query to create the method nodes, grouped by the class that owns them.
+        As METHODS_QUERY, the methods of names that are not classes are not created.
+        """
+        query = (
+            "UNWIND $rows AS row "
+            "MATCH (a:class {snapshot: $snapshot, name: row.class_name}) "
+            "UNWIND row.methods AS m "
+            "CREATE (a)-[:HAS_METHOD]->"
+            "(:method {name: m.name, snapshot: $snapshot, visibility: m.visibility})"
+        )
+        for chunk in self._chunks(rows):
+            tx.run(query, rows=chunk, snapshot=self.mode.value)
+
+    def _create_relations(self, tx: Transaction, relation: Relationship,
+                          rows: list[dict]) -> None:
+        """
+        Query to create the relationships of one type.
+        If the classes do not exist, library nodes are created,
+        with the package attribute set to 'library'.
+        """
+        query = (
+            "UNWIND $rows AS row "
+            "MATCH (a:class {snapshot: $snapshot, name: row.class1}), "
+            "(b:class {snapshot: $snapshot, name: row.class2}) "
+            f"CREATE (a)-[r:{relation.name}] -> (b)"
+        )
+        for chunk in self._chunks(rows):
+            names = list({name for row in chunk
+                          for name in (row['class1'], row['class2'])})
+            tx.run(LIBRARY_QUERY, snapshot=self.mode.value, names=names)
+            tx.run(query, rows=chunk, snapshot=self.mode.value)
+
+    def _set_packages(self, tx: Transaction, rows: list[dict]) -> None:
+        """
+        Query to set the package name to the classes.
+        """
+        query = (
+            "UNWIND $rows AS row "
+            "MATCH (a:class {snapshot: $snapshot, name: row.class_name}) "
+            "SET a.package = row.package_name"
+        )
+        for chunk in self._chunks(rows):
+            tx.run(query, rows=chunk, snapshot=self.mode.value)
+
+    def _flush(self) -> None:
+        """
+        Write the buffered events:
+        classes, then methods, then relations, then packages.
         """
         with self.driver.session() as session:
-            session.execute_write(self._create_method,  # type: ignore
-                                  class_name, method_name, kind)
+            if self.classes:
+                session.execute_write(self._create_classes,  # type: ignore
+                                      self.classes)
+            if self.methods:
+                rows = [{'class_name': class_name, 'methods': methods}
+                        for class_name, methods in self.methods.items()]
+                session.execute_write(self._create_class_methods,  # type: ignore
+                                      rows)
+            for relation, rows in self.relations.items():
+                session.execute_write(self._create_relations,  # type: ignore
+                                      relation, rows)
+            if self.packages:
+                session.execute_write(self._set_packages,  # type: ignore
+                                      self.packages)
+        self.classes = []
+        self.methods = {}
+        self.relations = {}
+        self.packages = []
+        self.buffered = 0
+
+    def _buffer_rows(self, rows: int) -> None:
+        """
+        Count the rows buffered, and write them when there are flush_size rows.
+        """
+        self.buffered += rows
+        if self.buffered >= self.flush_size:
+            self._flush()
+
+    @override
+    def close_observer(self) -> None:
+        """
+        Write the buffered events and close the connection.
+        """
+        self._flush()
+        self.close()
+
+    @override
+    def on_class_found(self, class_name: str, kind: ClassKind) -> None:
+        """
+        Buffer the class found.
+        """
+        self.classes.append({'name': class_name, 'type': kind.value})
+        self._buffer_rows(1)
+
+    @override
+    def on_relation_found(self, class1: str, class2: str, relation: Relationship) -> None:
+        """
+        Buffer the relationship found, grouped by its type.
+        """
+        self.relations.setdefault(relation, []).append(
+            {'class1': class1, 'class2': class2})
+        self._buffer_rows(1)
+
+    @override
+    def on_package_found(self, package_name: str, classes: list) -> None:
+        """
+        Buffer the package name of the classes.
+        """
+        for class_name in classes:
+            self.packages.append({'class_name': class_name,
+                                  'package_name': package_name})
+        self._buffer_rows(len(classes))
+
+    @override
+    def on_method_found(self, class_name: str, method_name: str, kind: MethodKind) -> None:
+        """
+        Buffer the method found, grouped by its class.
+        """
+        self.methods.setdefault(class_name, []).append(
+            {'name': method_name, 'visibility': kind.value})
+        self._buffer_rows(1)
 
 
 def init_module(api: CddeAPI) -> None:
@@ -168,3 +380,4 @@ def init_module(api: CddeAPI) -> None:
     Initialize the module on the API.
     """
     api.register_puml_observer('Neo4j', Neo4j)
+    api.register_puml_observer('Neo4j-batch', Neo4jBatch)
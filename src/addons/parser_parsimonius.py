@@ -3,6 +3,8 @@ Module parser with parsimonius implementation.
 In this module we define the parser with parsimonius to parse the plantuml file.
 Contains the grammar and the class that implements the parser.
 """
+import os
+import threading
 from typing import Any
 # type: ignore[import-untyped]   # pylint: disable=import-error
 from parsimonious.grammar import Grammar
@@ -12,6 +14,25 @@ from src.cdde.addons_api import CddeAPI
 from src.cdde.puml_observer import Observer, MethodKind
 from src.cdde.constants import convert_relation, convert_class_kind, Direction, convert_visibility
 
+# Compiled grammars of the process, by path and modification time.
+_GRAMMARS: dict[tuple[str, int], Grammar] = {}
+_GRAMMARS_LOCK = threading.Lock()
+
+
+def load_grammar(file_grammar: str) -> Grammar:
+    """
+    Get the compiled grammar of a file, compiling it once per process.
+    """
+    path = os.path.abspath(file_grammar)
+    key = (path, os.stat(path).st_mtime_ns)
+    with _GRAMMARS_LOCK:
+        grammar = _GRAMMARS.get(key)
+        if grammar is None:
+            with open(path, 'r', encoding='utf-8') as grammar_file:
+                grammar = Grammar(grammar_file.read())
+            _GRAMMARS[key] = grammar
+    return grammar
+
 
 class Parsimonius(NodeVisitor):
     """
@@ -25,11 +46,9 @@ class Parsimonius(NodeVisitor):
 
     def _init_grammar(self) -> Grammar:
         """
-        Initialize the grammar.
+        Initialize the grammar, compiled only the first time it is used.
         """
-        with open(self.file_grammar, 'r', encoding='utf-8') as grammar_file:
-            grammar_text = grammar_file.read()
-        return Grammar(grammar_text)
+        return load_grammar(self.file_grammar)
 
     def parse_uml(self, file: str) -> None:
         """ 
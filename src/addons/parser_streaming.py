@@ -0,0 +1,687 @@
+"""
+Module parser with a streaming implementation.
+The plantuml file is read line by line and matched with the rules
+of the parsimonious grammars, without building a parse tree.
+The events of each top-level declaration are sent as soon as it is matched,
+so only the lines of the current declaration are held in memory.
+The parallel parser splits the file in chunks of top-level declarations
+and parses them in a process pool.
+The file is mapped in memory and decoded one line at a time.
+"""
+import io
+import os
+import re
+import mmap
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, Callable
+from src.cdde.addons_api import CddeAPI
+from src.cdde.puml_parser import PumlParser
+from src.cdde.puml_observer import Observer
+from src.cdde.constants import convert_relation, convert_class_kind, Direction, convert_visibility
+
+# Rules shared by the grammars of all languages.
+WS = re.compile(r"\s+")
+OTHER = re.compile(r".*\n?")
+CLASS_NAME = re.compile(r'"[^"]*"|\'[^\']*\'|[^\s]+')
+METHOD_NAME = re.compile(r"[A-Za-z_<>\[\]\*\./={}][A-Za-z0-9_<>\[\]\*\./={}]*")
+CLASS_TYPES = ["class", "interface", "struct", "abstract class", "abstract"]
+RELATIONSHIP_TYPES = ['--|>', '<|--', '..|>', '<|..', '-->', '<--',
+                      '*--', '--*', 'o--', '--o', '--']
+
+# Rules that change with the grammar of each language.
+PY_NAME = re.compile(r'"?[A-Za-z_][A-Za-z0-9_.\[\]\'"]*"?')
+PY_VISIBILITY = ["__", "_"]
+PY_OTHER2 = re.compile(r"[^\n}]*")
+GO_NAME = re.compile(r'"?[A-Za-z_#[][A-Za-z0-9_.#\[\]]*"?')
+GO_VISIBILITY = ["+", "-", "#"]
+GO_RETURN_TYPE = re.compile(r"\(?[\[\]A-Za-z0-9_,\s\*\.]*\)?")
+GO_ATTRIBUTE_NAME = re.compile(r"[^\n]+")
+GO_COMMENT = re.compile(r"[^\n]*")
+
+GRAMMAR_LANGUAGE = re.compile(r"parsimonious_(\w+)\.txt$")
+
+# Minimum size in bytes of a chunk of the parallel parser.
+CHUNK_SIZE = 1 << 20
+
+# A match is the position where it ends and the value of the rule.
+Match = tuple[int, object] | None
+
+
+@contextmanager
+def mapped_file(file: str) -> Iterator[mmap.mmap | bytes]:
+    """
+    Map the file in memory, read only. Empty files can not be mapped.
+    """
+    with open(file, 'rb') as binary_file:
+        if os.fstat(binary_file.fileno()).st_size == 0:
+            yield b""
+            return
+        with mmap.mmap(binary_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+
+def decode(data: bytes) -> str:
+    """
+    Decode the text of the file, translating the newlines
+    as the files opened in text mode.
+    """
+    text = data.decode('utf-8')
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
+def mapped_lines(mapped: mmap.mmap | bytes, start: int = 0) -> Iterator[str]:
+    """
+    Decode the lines of the mapped file from the start offset, one at a time.
+    """
+    end = len(mapped)
+    while start < end:
+        newline = mapped.find(b"\n", start)
+        stop = end if newline == -1 else newline + 1
+        yield decode(mapped[start:stop])
+        start = stop
+
+
+class LineBuffer:
+    """
+    Text of the file, read line by line when the rules need it.
+    Positions are absolute in the file, the lines before
+    the current declaration are dropped.
+    touched_end is set when a rule reads the end of the file,
+    its match could change if the file continued.
+    """
+
+    def __init__(self, lines: Iterator[str]) -> None:
+        self.lines = lines
+        self.text = ""
+        self.offset = 0
+        self.eof = False
+        self.touched_end = False
+
+    def _pull(self) -> None:
+        """
+        Read the next line of the file.
+        """
+        line = next(self.lines, None)
+        if line is None:
+            self.eof = True
+        else:
+            self.text += line
+
+    def _end(self) -> int:
+        return self.offset + len(self.text)
+
+    def at_end(self, pos: int) -> bool:
+        """
+        Check if the position is at the end of the file.
+        """
+        while pos >= self._end() and not self.eof:
+            self._pull()
+        if pos >= self._end():
+            self.touched_end = True
+            return True
+        return False
+
+    def drop(self, pos: int) -> None:
+        """
+        Drop the text before the position, it is not needed anymore.
+        """
+        self.text = self.text[pos - self.offset:]
+        self.offset = pos
+
+    def literal(self, pos: int, literal: str) -> int | None:
+        """
+        Match a literal, literals never cross lines.
+        """
+        self.at_end(pos)
+        if self.text.startswith(literal, pos - self.offset):
+            return pos + len(literal)
+        return None
+
+    def literals(self, pos: int, literals: list[str]) -> Match:
+        """
+        Match the first literal of the list, as an ordered choice.
+        """
+        for literal in literals:
+            end = self.literal(pos, literal)
+            if end is not None:
+                return end, literal
+        return None
+
+    def regex(self, pos: int, regex: re.Pattern, multiline: bool = False) -> Match:
+        """
+        Match a regex. If it can cross lines and it reaches the end of the text read,
+        the next line is read and the regex is matched again.
+        """
+        self.at_end(pos)
+        while True:
+            match = regex.match(self.text, pos - self.offset)
+            if not (multiline and match and match.end() == len(self.text)):
+                break
+            if self.eof:
+                self.touched_end = True
+                break
+            self._pull()
+        if match is None:
+            return None
+        return self.offset + match.end(), match.group()
+
+    def quoted(self, pos: int) -> None:
+        """
+        Read the lines until the quote that starts at the position is closed.
+        """
+        self.at_end(pos)
+        index = pos - self.offset
+        if index >= len(self.text) or self.text[index] not in "\"'":
+            return
+        while self.text.find(self.text[index], index + 1) == -1:
+            if self.eof:
+                self.touched_end = True
+                return
+            self._pull()
+
+
+class DeclarationMatcher:
+    """
+    Matches the top-level declarations of a plantuml file and gives their events.
+    Each method matches a rule of the grammar, as parsimonious does:
+    ordered choices, greedy quantifiers and no backtracking inside a rule.
+    The grammar file selects the language of the rules.
+    """
+
+    def __init__(self, file_grammar: str) -> None:
+        match = GRAMMAR_LANGUAGE.search(os.path.basename(file_grammar))
+        language = match.group(1) if match else ""
+        if language not in ("py", "go"):
+            raise ValueError(f"The streaming parser does not support {file_grammar}.")
+        self.name = PY_NAME if language == "py" else GO_NAME
+        self.body: Callable[[int], Match] = (self._py_body if language == "py"
+                                             else self._go_body)
+        self.buffer = LineBuffer(iter(()))
+        self.touched_end = False
+        self.end = 0
+
+    def declarations(self, lines: Iterator[str],
+                     stop: int | None = None) -> Iterator[list[tuple]]:
+        """
+        Match the top-level declarations, until the end of the file
+        or the first one that starts at or after stop.
+        Yields the events of each declaration.
+        Then, end is the position after the last one, and touched_end
+        tells if a match read up to the end of the lines.
+        """
+        self.buffer = LineBuffer(lines)
+        pos = 0
+        while not self.buffer.at_end(pos) and (stop is None or pos < stop):
+            self.buffer.touched_end = False
+            match = (self._package(pos, "package") or self._package(pos, "namespace") or
+                     self._class_definition(pos) or self._relationship(pos) or
+                     self.buffer.regex(pos, OTHER))
+            pos, value = match  # type: ignore
+            if self.buffer.touched_end:
+                self.touched_end = True
+            if isinstance(value, tuple):
+                yield value[1]
+            self.buffer.drop(pos)
+        self.end = pos
+
+    def _ws(self, pos: int) -> int | None:
+        """
+        Match the required whitespace.
+        """
+        match = self.buffer.regex(pos, WS, multiline=True)
+        return match[0] if match else None
+
+    def _opt_ws(self, pos: int) -> int:
+        """
+        Match the optional whitespace.
+        """
+        if self.buffer.at_end(pos):
+            return pos
+        return self._ws(pos) or pos
+
+    def _optional(self, pos: int, rule: Callable[[int], Match]) -> Match:
+        """
+        Match an optional rule, it is not tried at the end of the file.
+        """
+        if self.buffer.at_end(pos):
+            return None
+        return rule(pos)
+
+    def _many(self, pos: int, rule: Callable[[int], Match]) -> tuple[int, list]:
+        """
+        Match a rule zero or more times.
+        """
+        values = []
+        while not self.buffer.at_end(pos):
+            match = rule(pos)
+            if match is None:
+                break
+            values.append(match[1])
+            if match[0] == pos:
+                break
+            pos = match[0]
+        return pos, values
+
+    def _package(self, pos: int, keyword: str) -> Match:
+        """
+        package = ws? "package" ws? name ws? "{" ws? class_definition+ ws? "}"
+        """
+        end = self.buffer.literal(self._opt_ws(pos), keyword)
+        if end is None:
+            return None
+        name = self.buffer.regex(self._opt_ws(end), self.name)
+        if name is None:
+            return None
+        end = self.buffer.literal(self._opt_ws(name[0]), "{")
+        if end is None:
+            return None
+        end, classes = self._many(self._opt_ws(end), self._class_definition)
+        if not classes:
+            return None
+        end = self.buffer.literal(self._opt_ws(end), "}")
+        if end is None:
+            return None
+        events = [event for _, class_events in classes for event in class_events]
+        events.append(('package', str(name[1]).strip('"'),
+                       [class_name for class_name, _ in classes]))
+        return end, ('package', events)
+
+    def _class_definition(self, pos: int) -> Match:
+        """
+        class_definition = ws? class_type ws class_name ws? alias? ws? stereotype? ws?
+                           "{" ws? body* ws? "}"
+        """
+        class_type = self.buffer.literals(self._opt_ws(pos), CLASS_TYPES)
+        if class_type is None:
+            return None
+        end = self._ws(class_type[0])
+        if end is None:
+            return None
+        self.buffer.quoted(end)
+        class_name = self.buffer.regex(end, CLASS_NAME, multiline=True)
+        if class_name is None:
+            return None
+        name = str(class_name[1]).strip(' ')
+        end = self._opt_ws(class_name[0])
+        alias = self._optional(end, self._alias)
+        if alias is not None:
+            end, name = alias[0], str(alias[1])
+        end = self._opt_ws(end)
+        stereotype = self._optional(end, self._stereotype)
+        if stereotype is not None:
+            end = stereotype[0]
+        end = self.buffer.literal(self._opt_ws(end), "{")
+        if end is None:
+            return None
+        end, methods = self._many(self._opt_ws(end), self.body)
+        end = self.buffer.literal(self._opt_ws(end), "}")
+        if end is None:
+            return None
+        return end, (name, [('class', name, class_type[1], methods)])
+
+    def _alias(self, pos: int) -> Match:
+        """
+        alias = "as" ws name
+        """
+        end = self.buffer.literal(pos, "as")
+        if end is None:
+            return None
+        end = self._ws(end)
+        if end is None:
+            return None
+        name = self.buffer.regex(end, self.name)
+        if name is None:
+            return None
+        return name[0], str(name[1]).strip('"')
+
+    def _stereotype(self, pos: int) -> Match:
+        """
+        stereotype = "<<" ws? "(" ws? name ws? "," ws? name ws? ")" ws? ">>"
+        """
+        end: int | None = pos
+        for token in ["<<", "(", self.name, ",", self.name, ")", ">>"]:
+            if end != pos:
+                end = self._opt_ws(end)  # type: ignore
+            if isinstance(token, str):
+                end = self.buffer.literal(end, token)  # type: ignore
+            else:
+                match = self.buffer.regex(end, token)  # type: ignore
+                end = match[0] if match else None
+            if end is None:
+                return None
+        return end, None
+
+    def _relationship(self, pos: int) -> Match:
+        """
+        relationship = name ws* relationship_type ws* name ws?
+        """
+        class_a = self.buffer.regex(pos, self.name)
+        if class_a is None:
+            return None
+        rel_type = self.buffer.literals(self._opt_ws(class_a[0]), RELATIONSHIP_TYPES)
+        if rel_type is None:
+            return None
+        class_b = self.buffer.regex(self._opt_ws(rel_type[0]), self.name)
+        if class_b is None:
+            return None
+        return self._opt_ws(class_b[0]), ('relation', [
+            ('relation', str(class_a[1]).strip('"'), rel_type[1],
+             str(class_b[1]).strip('"'))])
+
+    def _py_body(self, pos: int) -> Match:
+        """
+        body = (method / attribute) ws?
+        """
+        match = self._py_method(pos) or self._py_attribute(pos)
+        if match is None:
+            return None
+        return self._opt_ws(match[0]), match[1]
+
+    def _py_method(self, pos: int) -> Match:
+        """
+        method = visibility? ws? method_name ws? "(" other2
+        """
+        end = pos
+        visibility = self._optional(pos, lambda p: self.buffer.literals(p, PY_VISIBILITY))
+        if visibility is not None:
+            end = visibility[0]
+        method_name = self.buffer.regex(self._opt_ws(end), METHOD_NAME)
+        if method_name is None:
+            return None
+        end = self.buffer.literal(self._opt_ws(method_name[0]), "(")
+        if end is None:
+            return None
+        other = self.buffer.regex(end, PY_OTHER2)
+        if other is None:
+            return None
+        return other[0], (str(visibility[1]) if visibility else "") + str(method_name[1])
+
+    def _py_attribute(self, pos: int) -> Match:
+        """
+        attribute = visibility? attribute_name ws? ":"? ws? other2?
+        """
+        end = pos
+        visibility = self._optional(pos, lambda p: self.buffer.literals(p, PY_VISIBILITY))
+        if visibility is not None:
+            end = visibility[0]
+        attribute_name = self.buffer.regex(end, PY_NAME)
+        if attribute_name is None:
+            return None
+        end = self._opt_ws(attribute_name[0])
+        colon = self._optional(end, lambda p: self.buffer.literals(p, [":"]))
+        if colon is not None:
+            end = colon[0]
+        end = self._opt_ws(end)
+        other = self._optional(end, lambda p: self.buffer.regex(p, PY_OTHER2))
+        if other is not None:
+            end = other[0]
+        return end, ""
+
+    def _go_body(self, pos: int) -> Match:
+        """
+        body = method / attribute / comment
+        """
+        return self._go_method(pos) or self._go_attribute(pos) or self._go_comment(pos)
+
+    def _go_method(self, pos: int) -> Match:
+        """
+        method = visibility ws? method_name "(" arguments? ")" ws return_type? ws?
+        """
+        visibility = self.buffer.literals(pos, GO_VISIBILITY)
+        if visibility is None:
+            return None
+        method_name = self.buffer.regex(self._opt_ws(visibility[0]), METHOD_NAME)
+        if method_name is None:
+            return None
+        end = self.buffer.literal(method_name[0], "(")
+        if end is None:
+            return None
+        arguments = self._optional(end, self._go_arguments)
+        if arguments is not None:
+            end = arguments[0]
+        end = self.buffer.literal(end, ")")
+        if end is None:
+            return None
+        end = self._ws(end)
+        if end is None:
+            return None
+        return_type = self._optional(
+            end, lambda p: self.buffer.regex(p, GO_RETURN_TYPE, multiline=True))
+        if return_type is not None:
+            end = return_type[0]
+        return self._opt_ws(end), str(visibility[1]) + str(method_name[1])
+
+    def _go_arguments(self, pos: int) -> Match:
+        """
+        arguments = argument ("," ws? ws? argument)* ws?
+        """
+        argument = self._go_argument(pos)
+        if argument is None:
+            return None
+        end, _ = self._many(argument[0], self._go_next_argument)
+        return self._opt_ws(end), None
+
+    def _go_next_argument(self, pos: int) -> Match:
+        """
+        "," ws? ws? argument
+        """
+        end = self.buffer.literal(pos, ",")
+        if end is None:
+            return None
+        return self._go_argument(self._opt_ws(self._opt_ws(end)))
+
+    def _go_argument(self, pos: int) -> Match:
+        """
+        argument = ws? method_name ws? type_expr* ws?
+        """
+        method_name = self.buffer.regex(self._opt_ws(pos), METHOD_NAME)
+        if method_name is None:
+            return None
+        end, _ = self._many(self._opt_ws(method_name[0]), self._go_type_expr)
+        return self._opt_ws(end), None
+
+    def _go_type_expr(self, pos: int) -> Match:
+        """
+        type_expr = method_name ws? method_name?
+        """
+        method_name = self.buffer.regex(pos, METHOD_NAME)
+        if method_name is None:
+            return None
+        end = self._opt_ws(method_name[0])
+        second_name = self._optional(end, lambda p: self.buffer.regex(p, METHOD_NAME))
+        if second_name is not None:
+            end = second_name[0]
+        return end, None
+
+    def _go_attribute(self, pos: int) -> Match:
+        """
+        attribute = visibility ws? attribute_name ws?
+        """
+        visibility = self.buffer.literals(pos, GO_VISIBILITY)
+        if visibility is None:
+            return None
+        attribute_name = self.buffer.regex(self._opt_ws(visibility[0]), GO_ATTRIBUTE_NAME)
+        if attribute_name is None:
+            return None
+        return self._opt_ws(attribute_name[0]), ""
+
+    def _go_comment(self, pos: int) -> Match:
+        """
+        comment = ws? "'" ~"[^\\n]*"
+        """
+        end = self.buffer.literal(self._opt_ws(pos), "'")
+        if end is None:
+            return None
+        comment = self.buffer.regex(end, GO_COMMENT)
+        if comment is None:
+            return None
+        return comment[0], ""
+
+
+class StreamingParser(PumlParser):
+    """
+    Class that implements a streaming parser for the plantuml file.
+    The declarations are matched by a DeclarationMatcher
+    and their events are sent to the observer as they are found.
+    """
+
+    def __init__(self, observer: Observer, file_grammar: str) -> None:
+        super().__init__(observer)
+        self.matcher = DeclarationMatcher(file_grammar)
+        self.file_grammar = file_grammar
+
+    def parse_uml(self, file: str) -> None:
+        """
+        Main method to parse the plantuml file.
+        """
+        with mapped_file(file) as mapped:
+            self.observer.open_observer()
+            self._parse_lines(mapped_lines(mapped))
+            self.observer.close_observer()
+
+    def _parse_lines(self, lines: Iterator[str]) -> None:
+        """
+        Match the top-level declarations and send their events.
+        """
+        for events in self.matcher.declarations(lines):
+            self._send(events)
+
+    def _send(self, events: list[tuple]) -> None:
+        """
+        Send the events of a declaration to the observer.
+        """
+        for event in events:
+            if event[0] == 'class':
+                self._send_class(event[1], event[2], event[3])
+            elif event[0] == 'relation':
+                rel_type, reverse = convert_relation(event[2])
+                if reverse == Direction.BACKWARD:
+                    self.observer.on_relation_found(event[3], event[1], rel_type)
+                else:
+                    self.observer.on_relation_found(event[1], event[3], rel_type)
+            else:
+                self.observer.on_package_found(event[1], event[2])
+
+    def _send_class(self, class_name: str, class_type: str, methods: list[str]) -> None:
+        """
+        Send the class found and its methods.
+        """
+        self.observer.on_class_found(class_name, convert_class_kind(class_type))
+        for method in methods:
+            if method != "":
+                if method[0:2] in ['__']:
+                    kind = method[0:2]
+                    method_name = method[2:]
+                elif method[0] in ['+', '-', '#', '_']:
+                    kind = method[0]
+                    method_name = method[1:]
+                else:
+                    kind = ''
+                    method_name = method
+                self.observer.on_method_found(
+                    class_name, method_name, convert_visibility(kind))
+
+
+def parse_chunk(file_grammar: str, file: str,
+                chunk: tuple[int, int, int]) -> tuple[list[tuple], bool]:
+    """
+    Parse a chunk of a plantuml file in a worker process.
+    The chunk is the offset of its start, its end and the end of the first line
+    of the next one, that is parsed with it.
+    Returns the events of the chunk, and if the chunk ends with a declaration
+    whose match did not depend on the text after the chunk.
+    The last chunk of the file ends with the file, and is always complete.
+    """
+    start, stop, lookahead = chunk
+    with mapped_file(file) as mapped:
+        text = decode(mapped[start:stop])
+        end = len(text) if lookahead > stop else None
+        text += decode(mapped[stop:lookahead])
+    matcher = DeclarationMatcher(file_grammar)
+    events = [event for declaration in matcher.declarations(io.StringIO(text), end)
+              for event in declaration]
+    return events, end is None or (matcher.end == end and not matcher.touched_end)
+
+
+class ParallelStreamingParser(StreamingParser):
+    """
+    Streaming parser that splits the plantuml file in chunks
+    after the closing braces of top-level declarations,
+    and parses them in a process pool. The events are sent in the order of the file.
+    If a chunk does not end with a declaration,
+    the rest of the file is parsed in order.
+    """
+
+    def __init__(self, observer: Observer, file_grammar: str,
+                 chunk_size: int = CHUNK_SIZE, workers: int | None = None) -> None:
+        super().__init__(observer, file_grammar)
+        self.chunk_size = chunk_size
+        self.workers = workers or os.cpu_count()
+
+    def parse_uml(self, file: str) -> None:
+        """
+        Main method to parse the plantuml file.
+        """
+        with mapped_file(file) as mapped:
+            self.observer.open_observer()
+            chunks = self._chunks(mapped)
+            if len(chunks) == 1:
+                self._parse_lines(mapped_lines(mapped))
+            else:
+                self._parse_chunks(file, mapped, chunks)
+            self.observer.close_observer()
+
+    def _chunks(self, mapped: mmap.mmap | bytes) -> list[tuple[int, int, int]]:
+        """
+        Split the file in chunks of at least chunk_size bytes
+        that end with a closing brace at the start of a line.
+        Each chunk has the first line of the next one, to match the rules
+        that read the whitespace after the brace.
+        """
+        chunks = []
+        start = 0
+        search = self.chunk_size
+        while True:
+            brace = mapped.find(b"\n}\n", search)
+            if brace == -1:
+                break
+            stop = brace + 2
+            lookahead = mapped.find(b"\n", stop + 1) + 1
+            if lookahead == 0:
+                break
+            search = stop
+            if mapped[stop + 1:lookahead].strip():
+                chunks.append((start, stop, lookahead))
+                start = stop
+                search = stop + self.chunk_size
+        chunks.append((start, len(mapped), len(mapped)))
+        return chunks
+
+    def _parse_chunks(self, file: str, mapped: mmap.mmap | bytes,
+                      chunks: list[tuple[int, int, int]]) -> None:
+        """
+        Parse the chunks in a process pool and send their events in order.
+        The workers map the file, only the offsets of the chunks are sent to them.
+        """
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(parse_chunk, self.file_grammar, file, chunk)
+                       for chunk in chunks]
+            for n_chunk, future in enumerate(futures):
+                events, complete = future.result()
+                if not complete:
+                    for pending in futures[n_chunk + 1:]:
+                        pending.cancel()
+                    self._parse_lines(mapped_lines(mapped, chunks[n_chunk][0]))
+                    return
+                self._send(events)
+
+
+def init_module(api: CddeAPI) -> None:
+    """
+    Initialize the module on the API.
+    """
+    api.register_puml_parser('streaming', StreamingParser)
+    api.register_puml_parser('streaming-parallel', ParallelStreamingParser)
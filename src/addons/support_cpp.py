@@ -1,18 +1,82 @@
 """
 Support for C++ files to generate PlantUML files.
 """
-import subprocess
+import copyreg
+import io
 import os
-from pathlib import Path
+import pickle
+import re
+from concurrent.futures import ProcessPoolExecutor
+from importlib.metadata import version, PackageNotFoundError
+from CppHeaderParser.CppHeaderParser import TagStr
+from hpp2plantuml import Diagram
 from overrides import override
 from src.cdde.addons_api import CddeAPI
-from src.cdde.puml_generator import PumlGenerator
+from src.cdde.puml_generator import PumlGenerator, walk_sources
+
+INCLUDE_PATTERN = re.compile(r'^\s*#\s*include\s*"([^"]+)"', re.MULTILINE)
+# Extensions of the headers read by hpp2plantuml.
+HEADER_EXTENSIONS = ('.hpp', '.h')
+# Maximum number of headers parsed by a single call of hpp2plantuml.
+MAX_HEADERS_PER_RUN = 200
+# Versions of hpp2plantuml whose parsed objects are shared between diagrams,
+# they are kept in a private list of the Diagram.
+SHARED_OBJECTS_VERSIONS = ("0.8.",)
+
+
+def shares_objects() -> bool:
+    """
+    Check if the installed hpp2plantuml is a version
+    whose parsed objects can be shared between diagrams.
+    """
+    try:
+        return version("hpp2plantuml").startswith(SHARED_OBJECTS_VERSIONS)
+    except PackageNotFoundError:
+        return False
+
+
+class HeaderDiagram(Diagram):
+    """
+    Diagram of hpp2plantuml that can take the objects parsed by other diagrams.
+    Only for the versions of SHARED_OBJECTS_VERSIONS.
+    """
+
+    def objects(self) -> list:
+        """
+        Get the parsed objects.
+        """
+        return self._objects
+
+    def add_objects(self, objects: list) -> None:
+        """
+        Add objects parsed by another diagram.
+        """
+        self._objects += objects
+
+
+def parse_headers(headers: list[str]) -> bytes:
+    """
+    Parse some headers with hpp2plantuml, without their relationships,
+    and pickle the objects found for the main process.
+    Some of their names are TagStr, that cannot be unpickled,
+    so they are pickled as plain strings.
+    """
+    diagram = HeaderDiagram()
+    diagram.add_from_file_list(headers)
+    data = io.BytesIO()
+    pickler = pickle.Pickler(data, protocol=pickle.HIGHEST_PROTOCOL)
+    pickler.dispatch_table = copyreg.dispatch_table.copy()
+    pickler.dispatch_table[TagStr] = lambda tag: (str, (str(tag),))
+    pickler.dump(diagram.objects())
+    return data.getvalue()
 
 
 class CppPumlGenerator(PumlGenerator):
     """
     PlantUML generator for C++ files.
     """
+    source_extensions = ('.hpp', '.h', '.cpp', '.cc', '.cxx')
+
     @override
     def generate_plantuml(self, directory: str) -> str:
         """
@@ -21,6 +85,16 @@ class CppPumlGenerator(PumlGenerator):
         self._check_directory(directory)
         return self._hpp2plantuml(directory)
 
+    @override
+    def tool_version(self) -> str:
+        """
+        Get the version of hpp2plantuml.
+        """
+        try:
+            return "hpp2plantuml " + version("hpp2plantuml")
+        except PackageNotFoundError:
+            return "hpp2plantuml"
+
     def _check_directory(self, directory: str) -> None:
         """
         Check if the directory exists.
@@ -33,35 +107,70 @@ class CppPumlGenerator(PumlGenerator):
 
     def _cpp_files(self, directory: str) -> list:
         """
-        Get the C++ files in the directory and return them as a string.
+        Get the C++ headers in the directory, in a single walk
+        that skips the excluded directories.
         """
-        files = []
-        for root, _, files_in_dir in os.walk(directory):
-            files += self._search_cpp_files(files_in_dir, root)
-        return files
+        return [file for file in walk_sources(directory, self.exclude, HEADER_EXTENSIONS)
+                if self.in_scope(directory, file)]
 
-    def _search_cpp_files(self, files: list[str], root: str) -> list:
+    @override
+    def dependents(self, directory: str, packages: set[str]) -> set[str]:
         """
-        Search for C++ files in the list of files.
+        Get the directories with files that include a header of the given directories.
+        The includes are resolved from the directory of the file,
+        or matched by the end of their path.
         """
-        cpp_files = []
-        for file in files:
-            if file.endswith('.hpp') or file.endswith('.h'):
-                cpp_files.append(os.path.join(root, file))
-        return cpp_files
+        found = set()
+        for file in self.source_files(directory):
+            package = os.path.relpath(os.path.dirname(file), directory)
+            if package in packages or package in found:
+                continue
+            with open(file, 'r', encoding='utf-8', errors='ignore') as source:
+                content = source.read()
+            for include in INCLUDE_PATTERN.findall(content):
+                if self._includes_package(directory, file, include, packages):
+                    found.add(package)
+                    break
+        return found
 
-    def _hpp2plantuml(self, directory: str) -> str:
+    def _includes_package(self, directory: str, file: str, include: str,
+                          packages: set[str]) -> bool:
         """
-        Run hpp2plantuml.
+        Check if an include points to a header of the packages.
         """
-        # Buscar todos los .hpp y .h recursivamente
-        files = list(Path(directory).rglob("*.hpp")) + list(Path(directory).rglob("*.h"))
+        relative = os.path.relpath(
+            os.path.normpath(os.path.join(os.path.dirname(file), include)), directory)
+        if (os.path.dirname(relative) or '.') in packages:
+            return True
+        include_dir = os.path.dirname(os.path.normpath(include))
+        return bool(include_dir) and any(
+            package == include_dir or package.endswith(os.sep + include_dir)
+            for package in packages)
 
-        # Convertir a strings
-        files_str = [str(f) for f in files]
+    def _hpp2plantuml(self, directory: str) -> str:
+        """
+        Run hpp2plantuml on runs of at most MAX_HEADERS_PER_RUN headers,
+        in parallel if there are several workers and the version of hpp2plantuml
+        can share the parsed objects.
+        The relationships are found once all the headers are parsed,
+        so they are the same as with a single run.
+        """
+        files = self._cpp_files(directory)
+        size = max(1, min(MAX_HEADERS_PER_RUN, -(-len(files) // self.workers)))
+        runs = [files[i:i + size] for i in range(0, len(files), size)]
+        diagram = HeaderDiagram()
+        if self.workers > 1 and len(runs) > 1 and shares_objects():
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(runs))) as executor:
+                for data in executor.map(parse_headers, runs):
+                    diagram.add_objects(pickle.loads(data))
+        else:
+            for headers in runs:
+                diagram.add_from_file_list(headers)
+        diagram.build_relationship_lists()
+        diagram.sort_elements()
         file_path = os.path.join(directory, 'UML.plantuml')
-        subprocess.run(['hpp2plantuml', '-o', file_path,
-                        '-i'] + files_str, check=True)
+        with open(file_path, 'w', encoding="utf-8") as output_file:
+            output_file.write(diagram.render())
         return file_path
 
 
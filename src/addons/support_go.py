@@ -3,15 +3,39 @@ Support for Go files to generate PlantUML files.
 """
 import subprocess
 import os
+import re
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from typing import TextIO
 from overrides import override
 from src.cdde.addons_api import CddeAPI
 from src.cdde.puml_generator import PumlGenerator
 
+IMPORT_BLOCK_PATTERN = re.compile(r'^import\s*\(([^)]*)\)', re.MULTILINE)
+IMPORT_PATTERN = re.compile(r'^import\s+(?:[\w.]+\s+)?"([^"]+)"', re.MULTILINE)
+MODULE_PATTERN = re.compile(r'^module\s+(\S+)', re.MULTILINE)
+# Lines of the diagrams of goplantuml.
+NAMESPACE_PATTERN = re.compile(r'^namespace (\S+) \{$')
+TYPE_PATTERN = re.compile(r'^\s+(?:interface (\w+) |class (\w+) << \(S,Aquamarine\) >> )\s*\{$')
+METHOD_PATTERN = re.compile(r'^\s+[+-] (\w+)\((.*?)\) ?(.*)$')
+FONT_PATTERN = re.compile(r'</?font[^>]*>')
+IDENTIFIER_PATTERN = re.compile(r'(?<![\w.])([A-Za-z_]\w*)(?![\w.])')
+# Names that goplantuml does not qualify with the package of the type.
+GO_BUILTINS = {
+    'bool', 'string', 'error', 'any', 'byte', 'rune', 'uintptr',
+    'int', 'int8', 'int16', 'int32', 'int64',
+    'uint', 'uint8', 'uint16', 'uint32', 'uint64',
+    'float32', 'float64', 'complex64', 'complex128',
+    'map', 'chan', 'func', 'struct', 'interface'
+}
+
 
 class GoPumlGenerator(PumlGenerator):
     """
     PlantUML generator for Go files.
     """
+    source_extensions = ('.go',)
+
     @override
     def generate_plantuml(self, directory: str) -> str:
         """
@@ -20,6 +44,16 @@ class GoPumlGenerator(PumlGenerator):
         self._check_directory(directory)
         return self._goplantuml(directory)
 
+    @override
+    def tool_version(self) -> str:
+        """
+        Get the goplantuml binary, identified by its path and modification time.
+        """
+        binary = shutil.which('goplantuml')
+        version = "goplantuml" if binary is None else \
+            f"goplantuml {binary} {os.path.getmtime(binary)}"
+        return version
+
     def _check_directory(self, directory: str) -> None:
         """
         Check if the directory exists.
@@ -30,16 +64,187 @@ class GoPumlGenerator(PumlGenerator):
         if directory[-1] != '/':
             directory += '/'
 
+    @override
+    def dependents(self, directory: str, packages: set[str]) -> set[str]:
+        """
+        Get the packages that import one of the given packages,
+        the import paths are resolved with the module of go.mod.
+        """
+        module = self._module(directory)
+        if module is None:
+            return set()
+        imports = {module if package == '.' else f"{module}/{package}"
+                   for package in packages}
+        found = set()
+        for file in self.source_files(directory):
+            package = os.path.relpath(os.path.dirname(file), directory)
+            if package in packages or package in found:
+                continue
+            with open(file, 'r', encoding='utf-8', errors='ignore') as source:
+                content = source.read()
+            if imports & self._imports(content):
+                found.add(package)
+        return found
+
+    def _module(self, directory: str) -> str | None:
+        """
+        Get the module path of the go.mod file of the snapshot.
+        """
+        go_mod = os.path.join(directory, 'go.mod')
+        if not os.path.isfile(go_mod):
+            return None
+        with open(go_mod, 'r', encoding='utf-8') as file:
+            match = MODULE_PATTERN.search(file.read())
+        return match.group(1) if match else None
+
+    def _imports(self, content: str) -> set[str]:
+        """
+        Get the import paths of a Go file.
+        """
+        imports = set(IMPORT_PATTERN.findall(content))
+        for block in IMPORT_BLOCK_PATTERN.findall(content):
+            imports.update(re.findall(r'"([^"]+)"', block))
+        return imports
+
     def _goplantuml(self, directory: str) -> str:
         """
-        Run goplantuml
+        Run goplantuml, on the packages of the scope if there is one.
         """
         file_path = directory + 'UML.plantuml'
+        if self.workers > 1:
+            with open(file_path, 'w', encoding="utf-8") as output_file:
+                self._goplantuml_groups(self._package_groups(directory), output_file)
+            return file_path
+        if self.scope is None:
+            arguments = ['-recursive', directory]
+        else:
+            arguments = [os.path.join(directory, package) for package in self.scope
+                         if os.path.isdir(os.path.join(directory, package))]
         with open(file_path, 'w', encoding="utf-8") as output_file:
-            subprocess.run(['goplantuml', '-recursive', directory],
+            if not arguments:
+                output_file.write("@startuml\n@enduml\n")
+                return file_path
+            subprocess.run(['goplantuml'] + arguments,
                            stdout=output_file, check=True)
         return file_path
 
+    def _package_groups(self, directory: str) -> list[list[str]]:
+        """
+        Split the packages of the scope in one group per worker.
+        """
+        sizes: dict[str, int] = {}
+        for file in self.source_files(directory):
+            if self.in_scope(directory, file):
+                package = os.path.dirname(file)
+                sizes[package] = sizes.get(package, 0) + os.path.getsize(file)
+        return self.group_by_size(sizes)
+
+    def _goplantuml_groups(self, groups: list[list[str]], output_file: TextIO) -> None:
+        """
+        Run one goplantuml per group of packages in parallel,
+        and merge their diagrams in a single diagram.
+        goplantuml only finds the interfaces implemented by a struct
+        among the packages of its run, so the implementations between groups
+        are added with the same rule on the methods of the merged diagram.
+        """
+        output_file.write("@startuml\n")
+        diagrams = []
+        if groups:
+            with ThreadPoolExecutor(max_workers=len(groups)) as executor:
+                diagrams = list(executor.map(self._run_goplantuml, groups))
+        for diagram in diagrams:
+            output_file.writelines(line for line in diagram.splitlines(keepends=True)
+                                   if line.strip() not in ("@startuml", "@enduml"))
+        output_file.writelines(self._implementations(diagrams))
+        output_file.write("@enduml\n")
+
+    def _implementations(self, diagrams: list[str]) -> list[str]:
+        """
+        Get the implementations between the structs and the interfaces
+        of different diagrams. A struct implements an interface with methods
+        if it has all of them, with the same fully qualified types.
+        """
+        structs: list[tuple[int, str, set[tuple]]] = []
+        interfaces: list[tuple[int, str, set[tuple]]] = []
+        for n_diagram, diagram in enumerate(diagrams):
+            for name, is_interface, signatures in self._types(diagram):
+                (interfaces if is_interface else structs).append((n_diagram, name, signatures))
+        return [f'"{interface}" <|-- "{struct}"\n\n'
+                for n_struct, struct, methods in structs
+                for n_interface, interface, signatures in interfaces
+                if n_struct != n_interface and signatures and signatures <= methods]
+
+    def _types(self, diagram: str) -> list[tuple[str, bool, set[tuple]]]:
+        """
+        Get the structs and interfaces of a diagram of goplantuml,
+        with their full name, if they are an interface, and their method signatures.
+        """
+        types: list[tuple[str, bool, set[tuple]]] = []
+        package = ""
+        signatures: set[tuple] | None = None
+        for line in diagram.splitlines():
+            line = FONT_PATTERN.sub("", line)
+            namespace = NAMESPACE_PATTERN.match(line)
+            if namespace:
+                package = namespace.group(1)
+                continue
+            match = TYPE_PATTERN.match(line)
+            if match:
+                signatures = set()
+                types.append((f"{package}.{match.group(1) or match.group(2)}",
+                              match.group(1) is not None, signatures))
+                continue
+            if line.strip() == "}":
+                signatures = None
+                continue
+            method = METHOD_PATTERN.match(line) if signatures is not None else None
+            if method and signatures is not None:
+                name, parameters, results = method.groups()
+                signatures.add((name,
+                                tuple(self._full_type(package, parameter)
+                                      for parameter in self._parameter_types(parameters)),
+                                self._full_type(package, results.strip())))
+        return types
+
+    def _parameter_types(self, parameters: str) -> list[str]:
+        """
+        Get the types of the parameters of a method, without their names.
+        The interfaces are drawn without the names of the parameters.
+        """
+        types = []
+        depth = 0
+        start = 0
+        for index, char in enumerate(parameters + ","):
+            if char in "([{":
+                depth += 1
+            elif char in ")]}":
+                depth -= 1
+            elif char == "," and depth == 0:
+                parameter = parameters[start:index].strip()
+                start = index + 1
+                if not parameter:
+                    continue
+                name = re.match(r'(\w+) (.+)$', parameter)
+                if name and name.group(1) not in GO_BUILTINS:
+                    parameter = name.group(2)
+                types.append(parameter)
+        return types
+
+    def _full_type(self, package: str, type_name: str) -> str:
+        """
+        Qualify the names of a type with its package, as goplantuml compares them.
+        """
+        return IDENTIFIER_PATTERN.sub(
+            lambda name: name.group(1) if name.group(1) in GO_BUILTINS
+            else f"{package}.{name.group(1)}", type_name)
+
+    def _run_goplantuml(self, packages: list[str]) -> str:
+        """
+        Run goplantuml on some packages and get its diagram.
+        """
+        return subprocess.run(['goplantuml'] + packages, capture_output=True,
+                              check=True, encoding="utf-8").stdout
+
 
 def init_module(api: CddeAPI) -> None:
     """
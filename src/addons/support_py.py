@@ -3,15 +3,22 @@ Support for Python files to generate PlantUML files.
 """
 import subprocess
 import os
+import re
+from importlib.metadata import version, PackageNotFoundError
 from overrides import override
 from src.cdde.addons_api import CddeAPI
-from src.cdde.puml_generator import PumlGenerator
+from src.cdde.puml_generator import PumlGenerator, walk_sources
+
+IMPORT_PATTERN = re.compile(
+    r'^\s*(?:from\s+(\.*[\w.]*)\s+import|import\s+([\w., ]+))', re.MULTILINE)
 
 
 class PyPumlGenerator(PumlGenerator):
     """
     PlantUML generator for Python files.
     """
+    source_extensions = ('.py',)
+
     @override
     def generate_plantuml(self, directory: str) -> str:
         """
@@ -21,6 +28,16 @@ class PyPumlGenerator(PumlGenerator):
         directory = self.__ends_with_slash(directory)
         return self._pyreverse(directory)
 
+    @override
+    def tool_version(self) -> str:
+        """
+        Get the version of pylint, that provides pyreverse.
+        """
+        try:
+            return "pyreverse " + version("pylint")
+        except PackageNotFoundError:
+            return "pyreverse"
+
     def __is_a_directory(self, directory: str) -> None:
         """
         Check if the directory exists.
@@ -40,27 +57,71 @@ class PyPumlGenerator(PumlGenerator):
         """
         Get the python files in the directory and return them as a string.
         """
-        files = []
-        for root, dirs, files_in_dir in os.walk(directory):
-            dirs[:] = [d for d in dirs if d not in self.exclude]
-            files += self._search_py_files(files_in_dir, root)
-        return files
+        return [file for file in self.source_files(directory)
+                if self.in_scope(directory, file)]
 
-    def _search_py_files(self, files: list[str], root: str) -> list:
+    @override
+    def dependents(self, directory: str, packages: set[str]) -> set[str]:
         """
-        Search for python files in the list of files.
+        Get the packages that import a module of the given packages.
+        The modules are matched by their dotted path,
+        so packages under a source root are also found.
         """
-        py_files = []
-        for file in files:
-            if file.endswith('.py'):
-                py_files.append(os.path.join(root, file))
-        return py_files
+        dotted = {package.replace(os.sep, '.') for package in packages}
+        found = set()
+        for file in self.source_files(directory):
+            package = os.path.relpath(os.path.dirname(file), directory)
+            if package in packages or package in found:
+                continue
+            with open(file, 'r', encoding='utf-8', errors='ignore') as source:
+                content = source.read()
+            for module in self._imported_modules(content, package):
+                if self._is_in_packages(module, dotted):
+                    found.add(package)
+                    break
+        return found
+
+    def _imported_modules(self, content: str, package: str) -> list[str]:
+        """
+        Get the modules imported in a file,
+        the relative imports are resolved from the package of the file.
+        """
+        modules = []
+        for from_module, import_modules in IMPORT_PATTERN.findall(content):
+            if from_module.startswith('.'):
+                level = len(from_module) - len(from_module.lstrip('.'))
+                parts = [] if package == '.' else package.split(os.sep)
+                parts = parts[:len(parts) - level + 1]
+                modules.append('.'.join(parts + [from_module.lstrip('.')]).strip('.'))
+            elif from_module:
+                modules.append(from_module)
+            else:
+                modules += [module.split()[0] for module in import_modules.split(',')
+                            if module.strip()]
+        return modules
+
+    def _is_in_packages(self, module: str, dotted: set[str]) -> bool:
+        """
+        Check if the module, or one of its parents, is one of the packages.
+        """
+        parts = module.split('.')
+        for i in range(len(parts), 0, -1):
+            name = '.'.join(parts[:i])
+            for package in dotted:
+                if package == name or package.endswith('.' + name):
+                    return True
+        return False
 
     def _pyreverse(self, directory: str) -> str:
         """
         Run pyreverse
         """
         files = self._py_files(directory)
+        file_path = directory + "classes_" + 'UML.plantuml'
+        if not files:
+            with open(file_path, 'w', encoding="utf-8") as output_file:
+                output_file.write("@startuml classes_UML\n@enduml\n")
+            return file_path
         subprocess.run(['pyreverse', '-o', 'plantuml', '-p',
                         'UML', '-d', directory, '-f', 'ALL', '--all-ancestors'] + files, check=True,
                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
@@ -69,7 +130,6 @@ class PyPumlGenerator(PumlGenerator):
             packages = directory + 'packages_UML.plantuml'
             subprocess.run(['rm', '-rf', packages], check=True)
 
-        file_path = directory + "classes_" + 'UML.plantuml'
         return file_path
 
 
@@ -20,6 +20,7 @@ from .puml_observer import Observer
 from .metric_result_observer import ResultObserver
 from .expr_evaluator import ExprEvaluator
 from .design_db import DesignDB
+from .design_extractor import DesignExtractor
 
 class CddeAPIAbstract(ABC):
     """
@@ -56,6 +57,12 @@ class CddeAPIAbstract(ABC):
         """
         Register a design database.
         """
+    @abstractmethod
+    def register_design_extractor(self, extension: str,
+                                  extractor: Type[DesignExtractor]) -> None:
+        """
+        Register a design extractor.
+        """
 
 class CddeAPI(CddeAPIAbstract):
     """
@@ -69,6 +76,7 @@ class CddeAPI(CddeAPIAbstract):
         self.results_observers: dict[str, Type[ResultObserver]] = {}
         self.expr_evaluator: dict[str, Type[ExprEvaluator]] = {}
         self.design_db: dict[str, Type[DesignDB]] = {}
+        self.extractors: dict[str, Type[DesignExtractor]] = {}
 
     @override
     def register_puml_generator(self, extension: str, generator: Type[PumlGenerator]) -> None:
@@ -113,6 +121,14 @@ class CddeAPI(CddeAPIAbstract):
         """
         self.design_db[extension] = db
 
+    @override
+    def register_design_extractor(self, extension: str,
+                                  extractor: Type[DesignExtractor]) -> None:
+        """
+        Register a design extractor.
+        """
+        self.extractors[extension] = extractor
+
     def _generate_module_name(self, module: str) -> str:
         """
         Generate a unique module name.
@@ -0,0 +1,148 @@
+"""
+This module contains the location of the caches of the tool,
+shared between runs, and the caches of files on disk.
+"""
+import os
+import json
+import shutil
+import hashlib
+import subprocess
+import threading
+
+CACHE_ENV = "CDDE_CACHE_DIR"
+MAX_ENTRIES = 512
+
+
+def cache_dir(name: str) -> str:
+    """
+    Get a directory of the cache, creating it if it does not exist.
+    The cache is in $CDDE_CACHE_DIR, or in ~/.cache/cdde by default.
+    """
+    root = os.environ.get(CACHE_ENV,
+                          os.path.join(os.path.expanduser("~"), ".cache", "cdde"))
+    directory = os.path.join(root, name)
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+class FileCache:
+    """
+    Cache of files on disk, addressed by a key.
+    The least recently used files are evicted
+    when there are more than max_entries files.
+    """
+
+    def __init__(self, name: str, max_entries: int = MAX_ENTRIES) -> None:
+        self.directory = cache_dir(name)
+        self.max_entries = max_entries
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        """
+        Make a key from the hash of its parts.
+        """
+        return hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        """
+        Get the path of the cached file, or None if it is not cached.
+        """
+        path = os.path.join(self.directory, key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key: str, file: str) -> None:
+        """
+        Copy the file in the cache.
+        It is written in a temporary file first, so readers never see it partially.
+        """
+        path = os.path.join(self.directory, key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        shutil.copyfile(file, tmp_path)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def get_bytes(self, key: str) -> bytes | None:
+        """
+        Get the content of the cached file, or None if it is not cached.
+        """
+        path = self.get(key)
+        if path is None:
+            return None
+        try:
+            with open(path, 'rb') as file:
+                return file.read()
+        except FileNotFoundError:
+            return None
+
+    def put_bytes(self, key: str, data: bytes) -> None:
+        """
+        Write the content in the cache.
+        """
+        self._write(key, data)
+        self._evict()
+
+    def put_many(self, items: dict[str, bytes]) -> None:
+        """
+        Write the contents of several keys in the cache,
+        evicting the old files only once.
+        """
+        if not items:
+            return
+        for key, data in items.items():
+            self._write(key, data)
+        self._evict()
+
+    def _write(self, key: str, data: bytes) -> None:
+        """
+        Write the content in a temporary file and move it to the key.
+        """
+        path = os.path.join(self.directory, key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as file:
+            file.write(data)
+        os.replace(tmp_path, path)
+
+    def _evict(self) -> None:
+        """
+        Delete the least recently used files over max_entries.
+        """
+        entries = [entry for entry in os.scandir(self.directory)
+                   if entry.is_file() and not entry.name.endswith('.tmp')]
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - self.max_entries]:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+
+class PumlCache(FileCache):
+    """
+    Cache of the generated PlantUML files.
+    The key is the language, the version of the generator, the exclude list,
+    the scope and the git tree of the snapshot.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES) -> None:
+        super().__init__("plantuml", max_entries)
+
+    def key(self, language: str, version: str, exclude: list,
+            scope: list | None, directory: str) -> str | None:
+        """
+        Get the key of a snapshot, or None if it is not the root of a git checkout.
+        """
+        result = subprocess.run(["git", "-C", directory, "rev-parse",
+                                 "--show-toplevel", "HEAD^{tree}"],
+                                capture_output=True, check=False)
+        if result.returncode != 0:
+            return None
+        toplevel, tree = result.stdout.decode().split()
+        if os.path.realpath(toplevel) != os.path.realpath(directory):
+            return None
+        return self.make_key(language, version, sorted(exclude), scope, tree)
@@ -40,6 +40,25 @@ class Store(StrEnum):
     StrEnum for the database.
     """
     NEO4J = "Neo4j"
+    NEO4J_BATCH = "Neo4j-batch"
+    MEMORY = "memory"
+
+
+class Parser(StrEnum):
+    """
+    StrEnum for the parser of the PlantUML files.
+    """
+    PARSIMONIOUS = "parsimonious"
+    STREAMING = "streaming"
+    STREAMING_PARALLEL = "streaming-parallel"
+
+
+class Extractor(StrEnum):
+    """
+    StrEnum for the design extractor.
+    """
+    PLANTUML = "plantuml"
+    PY_AST = "py-ast"
 
 
 class FormatResult(StrEnum):
@@ -59,6 +78,17 @@ def set_language(language: Lang, main: Main) -> None:
         main.set_language(language.value)
 
 
+def set_extractor(extractor: Extractor, language: Lang) -> str | None:
+    """
+    Get the design extractor, None to generate and parse PlantUML files.
+    """
+    if extractor == Extractor.PLANTUML:
+        return None
+    if extractor == Extractor.PY_AST and language != Lang.PY:
+        raise typer.BadParameter("The py-ast extractor only reads Python sources.")
+    return extractor.value
+
+
 def add_yamls(yamls: list[str], main: Main) -> None:
     """
     Set the options of the tool.
@@ -67,13 +97,19 @@ def add_yamls(yamls: list[str], main: Main) -> None:
         main.set_expr_evaluator(yaml_filepath)
 
 
-def add_observer(observer: List[Store], main: Main) -> None:
+def add_observer(observer: List[Store], main: Main, batch_size: int,
+                 flush_size: int) -> None:
     """
     Set the options of the tool.
     """
     for obs in observer:
         if obs is not None:
-            main.set_observers(obs.value)
+            if obs == Store.NEO4J_BATCH:
+                main.set_observers(obs.value, batch_size=batch_size,
+                                   flush_size=flush_size)
+            else:
+                main.set_observers(obs.value)
+            main.set_store(obs.value)
 
 
 def add_visual_mode(visual: bool, main: Main) -> None:
@@ -133,25 +169,75 @@ def CddE(
         exclude: List[str] = typer.Option(
             [],
             help="Exclude specific files or directories from the analysis"),
-        uri: str = typer.Option("bolt://localhost:7689", help="URI of the Neo4j database")):
+        uri: str = typer.Option("bolt://localhost:7689", help="URI of the Neo4j database"),
+        batch_size: int = typer.Option(
+            5000, help="Number of rows per UNWIND query of the Neo4j-batch store"),
+        flush_size: int = typer.Option(
+            50000, help="Number of rows buffered by the Neo4j-batch store before writing them"),
+        parallel: bool = typer.Option(
+            False, help="Process the before and after snapshots concurrently: "
+                        "the PlantUML generators and extractors run in threads, "
+                        "the parsers in their own processes"),
+        generator_workers: int = typer.Option(
+            1, min=0,
+            help="Number of parallel processes of the PlantUML generator, 0 is one per CPU"),
+        diff_scoped: bool = typer.Option(
+            False, "--diff-scoped",
+            help="Only generate the packages touched by the PR and their direct dependents, "
+                 "the other packages of the PR are taken from the main branch"),
+        uml_cache: bool = typer.Option(
+            False, help="Reuse the PlantUML files generated for the same git tree, "
+                        "language, generator version, exclude list and scope. "
+                        "They are kept in $CDDE_CACHE_DIR/plantuml, ~/.cache/cdde by default"),
+        snapshot_cache: bool = typer.Option(
+            False, help="Reuse the parsed design of the PlantUML and source files already seen. "
+                        "It is kept in $CDDE_CACHE_DIR/snapshots and py-facts, "
+                        "~/.cache/cdde by default"),
+        parser: Parser = typer.Option(
+            Parser.PARSIMONIOUS.value, help="Select the parser of the PlantUML files"),
+        streaming_filter: bool = typer.Option(
+            False, "--streaming-filter",
+            help="Send the parsed events to the store as they are found"),
+        extractor: Extractor = typer.Option(
+            Extractor.PLANTUML.value,
+            help="Read the design from the sources instead of a PlantUML file")):
     """Run the tool CddE"""
     main = Main()
     main.set_api()
     set_language(lang, main)
     add_yamls(yamls, main)
-    add_observer(store, main)
+    add_observer(store, main, batch_size, flush_size)
     add_visual_mode(visual, main)
     add_result_observer(format_result, main)
     main.set_mode(mode.value)
     main.set_exclude(exclude)
+    main.set_parallel(parallel)
+    main.set_generator_workers(generator_workers)
+    main.set_diff_scoped(diff_scoped)
+    main.set_uml_cache(uml_cache)
+    main.set_snapshot_cache(snapshot_cache)
+    main.set_parser(parser.value)
+    main.set_filter("filter-streaming" if streaming_filter else "filter")
+    main.set_extractor(set_extractor(extractor, lang))
     main.set_uri(uri)
     main.run_cdde(repo_git, main_branch, pr_number)
 
 
 @app.command("set-thresholds")
-def set_thresholds():
+def set_thresholds(
+        workers: int = typer.Option(
+            1, help="Number of processes that evaluate the commit pairs"),
+        store: Store = typer.Option(Store.NEO4J,
+                                    help="Select graph database"),
+        uri: List[str] = typer.Option(
+            ["bolt://localhost:7689"],
+            help="URI of the Neo4j database, one per worker"),
+        sliding: bool = typer.Option(
+            False, "--sliding",
+            help="Generate and parse each commit once, reusing it as the next before")):
     """Run CddE thresholds initialization"""
     main = Main()
     main.set_api()
     set_json_to_multiple_metrics(main)
-    main.run_set_thresholds()
+    main.set_sliding(sliding)
+    main.run_set_thresholds(workers, store.value, uri)
@@ -44,11 +44,19 @@ class DesignDB(ABC):
     @abstractmethod
     def get_all_packages(self) -> list[str]:
         """
-        Obtains all packages in the database.
+        Obtains all packages in the database, in the order of their first class.
         """
 
-    @abstractmethod
     def set_packages(self, class_name: str) -> None:
         """
         Sets the packages of a class.
+        Not needed anymore, get_all_packages finds the packages by itself,
+        it is kept for the design databases of other addons.
+        """
+
+    def observer_options(self) -> dict:
+        """
+        Options of the observer that writes the database,
+        so it writes where this design database reads.
         """
+        return {}
@@ -0,0 +1,59 @@
+"""
+Abstract class for design extractors.
+An extractor reads the design of a snapshot from its source files
+and sends it to an observer, without generating and parsing a PlantUML file.
+"""
+from abc import ABC, abstractmethod
+import os
+from .puml_observer import Observer
+from .puml_generator import walk_sources
+
+
+class DesignExtractor(ABC):
+    """
+    Abstract class for design extractors.
+    """
+    # Language of the source files read by the extractor.
+    language: str = ""
+    # Extensions of the source files read by the extractor.
+    source_extensions: tuple[str, ...] = ()
+
+    def __init__(self, exclude: list):
+        self.exclude = exclude
+        self.scope: list[str] | None = None
+        self.use_cache = False
+
+    @abstractmethod
+    def extract_design(self, directory: str, observer: Observer) -> None:
+        """
+        Send the classes, methods and relationships of the snapshot to the observer,
+        opening the observer before and closing it after.
+        """
+
+    def set_scope(self, scope: list[str] | None) -> None:
+        """
+        Restrict the extraction to the packages of the scope,
+        given as directories relative to the snapshot. None is the whole snapshot.
+        """
+        self.scope = scope
+
+    def set_cache(self, use_cache: bool) -> None:
+        """
+        Set if the extractor can reuse what it read from the files already seen.
+        """
+        self.use_cache = use_cache
+
+    def in_scope(self, directory: str, file: str) -> bool:
+        """
+        Check if a file of the snapshot is in a package of the scope.
+        """
+        if self.scope is None:
+            return True
+        return os.path.relpath(os.path.dirname(file), directory) in self.scope
+
+    def source_files(self, directory: str) -> list[str]:
+        """
+        Get the source files of the snapshot, skipping the excluded directories.
+        The files outside the scope are included, to resolve the names used in the scope.
+        """
+        return walk_sources(directory, self.exclude, self.source_extensions)
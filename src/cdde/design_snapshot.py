@@ -0,0 +1,200 @@
+"""
+This module contains the cache of the parsed design of the snapshots.
+The events sent by the filter are recorded,
+and replayed to the observers when the same PlantUML file is parsed again.
+The recorded events of a snapshot can also be merged with the events of some of its packages.
+"""
+from collections import Counter
+import hashlib
+import inspect
+import pickle
+import zlib
+from overrides import override
+from .cache import FileCache, MAX_ENTRIES
+from .puml_observer import Observer, Modes, ClassKind, Relationship, MethodKind
+
+# Changes when the recorded events change, so old snapshots are not replayed.
+SNAPSHOT_FORMAT = 1
+
+
+class EventRecorder(Observer):
+    """
+    Observer that records the events it receives
+    and sends them to another observer.
+    """
+
+    def __init__(self, observer_to_send: Observer) -> None:
+        self.observer_to_send = observer_to_send
+        self.events: list[tuple] = []
+
+    @override
+    def set_mode(self, mode: Modes) -> None:
+        """
+        Set the mode of the observer.
+        """
+        self.observer_to_send.set_mode(mode)
+
+    @override
+    def open_observer(self) -> None:
+        """
+        Event triggered when the observer is opened.
+        """
+        self.observer_to_send.open_observer()
+
+    @override
+    def close_observer(self) -> None:
+        """
+        Event triggered when the observer is closed.
+        """
+        self.observer_to_send.close_observer()
+
+    @override
+    def on_class_found(self, class_name: str, kind: ClassKind) -> None:
+        """
+        Record and send the class found.
+        """
+        self.events.append(('on_class_found', class_name, kind))
+        self.observer_to_send.on_class_found(class_name, kind)
+
+    @override
+    def on_relation_found(self, class1: str, class2: str, relation: Relationship) -> None:
+        """
+        Record and send the relationship found.
+        """
+        self.events.append(('on_relation_found', class1, class2, relation))
+        self.observer_to_send.on_relation_found(class1, class2, relation)
+
+    @override
+    def on_package_found(self, package_name: str, classes: list) -> None:
+        """
+        Record and send the package found.
+        """
+        self.events.append(('on_package_found', package_name, list(classes)))
+        self.observer_to_send.on_package_found(package_name, classes)
+
+    @override
+    def on_method_found(self, class_name: str, method_name: str, kind: MethodKind) -> None:
+        """
+        Record and send the method found.
+        """
+        self.events.append(('on_method_found', class_name, method_name, kind))
+        self.observer_to_send.on_method_found(class_name, method_name, kind)
+
+
+def replay(events: list[tuple], observer: Observer, mode: Modes) -> None:
+    """
+    Send the recorded events to the observer, as a parse of the snapshot would.
+    """
+    observer.set_mode(mode)
+    observer.open_observer()
+    for event, *arguments in events:
+        getattr(observer, event)(*arguments)
+    observer.close_observer()
+
+
+def merge_scoped_events(whole: list[tuple], scoped_before: list[tuple],
+                        scoped_after: list[tuple]) -> list[tuple]:
+    """
+    Get the events of a snapshot from the events of the whole previous snapshot,
+    replacing the packages of a scope by their new version.
+    The classes, packages, methods and relationships found in the scope of the previous
+    snapshot are replaced by those found in the scope of the new one.
+    The relationships that are not found in the scope, as those declared outside of it,
+    are kept unless one of their classes was deleted.
+    The events are sent in the order of the filter: classes, relationships,
+    packages and methods.
+    """
+    scoped_classes = {event[1] for event in _events_of(scoped_before, 'on_class_found')}
+    new_classes = {event[1] for event in _events_of(scoped_after, 'on_class_found')}
+    replaced = scoped_classes | new_classes
+    deleted = scoped_classes - new_classes
+    scoped_packages = {event[1] for event in _events_of(scoped_before, 'on_package_found')}
+    method_classes = replaced | {event[1] for event in
+                                 _events_of(scoped_before + scoped_after, 'on_method_found')}
+    scoped_relations = Counter(_events_of(scoped_before, 'on_relation_found'))
+
+    relations = []
+    for event in _events_of(whole, 'on_relation_found'):
+        if scoped_relations[event] > 0:
+            scoped_relations[event] -= 1
+        elif event[1] not in deleted and event[2] not in deleted:
+            relations.append(event)
+    return ([event for event in _events_of(whole, 'on_class_found')
+             if event[1] not in replaced] +
+            _events_of(scoped_after, 'on_class_found') +
+            relations + _events_of(scoped_after, 'on_relation_found') +
+            [event for event in _events_of(whole, 'on_package_found')
+             if event[1] not in scoped_packages] +
+            _events_of(scoped_after, 'on_package_found') +
+            [event for event in _events_of(whole, 'on_method_found')
+             if event[1] not in method_classes] +
+            _events_of(scoped_after, 'on_method_found'))
+
+
+def _events_of(events: list[tuple], name: str) -> list[tuple]:
+    """
+    Get the recorded events of a kind.
+    """
+    return [event for event in events if event[0] == name]
+
+
+class SnapshotCache(FileCache):
+    """
+    Cache of the recorded events of the snapshots,
+    stored as compressed pickles.
+    The key is the hash of the PlantUML file, the language, the parser,
+    the filter, the grammar and the source code of the parser and filter classes,
+    so the events of an older version of the code are not replayed.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES) -> None:
+        super().__init__("snapshots", max_entries)
+
+    def key(self, language: str, parser: str, filter_name: str,
+            uml_path: str, grammar_path: str, code: tuple[type, ...] = ()) -> str:
+        """
+        Get the key of a PlantUML file.
+        code: the classes that read the file, their modules and the ones
+        of their bases are part of the key.
+        """
+        return self.make_key(SNAPSHOT_FORMAT, language, parser, filter_name,
+                             self._file_hash(uml_path), self._file_hash(grammar_path),
+                             [self._file_hash(path) for path in self._source_files(code)])
+
+    def _source_files(self, code: tuple[type, ...]) -> list[str]:
+        """
+        Get the source files of some classes and of their bases.
+        """
+        files: list[str] = []
+        for cls in code:
+            for base in cls.__mro__:
+                try:
+                    path = inspect.getsourcefile(base)
+                except TypeError:
+                    continue
+                if path is not None and path not in files:
+                    files.append(path)
+        return files
+
+    def _file_hash(self, path: str) -> str:
+        """
+        Get the hash of the content of a file.
+        """
+        with open(path, 'rb') as file:
+            return hashlib.sha256(file.read()).hexdigest()
+
+    def load(self, key: str) -> list[tuple] | None:
+        """
+        Load the events of a snapshot, or None if it is not cached.
+        """
+        data = self.get_bytes(key)
+        if data is None:
+            return None
+        return pickle.loads(zlib.decompress(data))
+
+    def store(self, key: str, events: list[tuple]) -> None:
+        """
+        Store the events of a snapshot.
+        """
+        self.put_bytes(key, zlib.compress(
+            pickle.dumps(events, protocol=pickle.HIGHEST_PROTOCOL)))
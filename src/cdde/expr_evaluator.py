@@ -1,5 +1,6 @@
 """ Abstract class for evaluating expressions. """
 from abc import ABC, abstractmethod
+from .design_db import DesignDB
 
 MetricType = float
 
@@ -16,3 +17,33 @@ class ExprEvaluator(ABC):
         """
         Evaluate the expression.
         """
+
+    def set_design_db(self, design_db: DesignDB) -> None:
+        """
+        Set the design database the expressions are evaluated on,
+        before the expressions of a run are evaluated.
+        By default, the evaluator does not need it.
+        """
+
+    def eval_grouped(self,
+                     expr: str,
+                     arguments: dict[str, list[str]],
+                     results: dict[str, str | float]) -> dict[str, MetricType]:
+        """
+        Evaluate a grouped expression, that returns the metric
+        of every class (or package) at once, indexed by its name.
+        The arguments have a single item, class_name or package_name,
+        with the list of the names of the classes (or packages).
+        The names without a row get the metric 0,
+        and the rows of names that are not in the list are ignored.
+        By default, the expression is evaluated with eval once per name,
+        with the same arguments and results as a per-class (or per-package)
+        expression, so an evaluator only needs to override it
+        when it can get all the rows faster.
+        """
+        rows: dict[str, MetricType] = {}
+        for parameter, names in arguments.items():
+            for name in names:
+                results[parameter.removesuffix('_name')] = name
+                rows[name] = self.eval(expr, {parameter: name}, results)
+        return rows
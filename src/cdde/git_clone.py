@@ -3,10 +3,77 @@ This module contains the GitClone class,
 which is used to create the before and after directories of a PR.
 """
 import os
-import subprocess
 import shutil
+import subprocess
+import fcntl
+import hashlib
+import tempfile
 from typing import Generator
 from git import Repo
+from .cache import cache_dir
+
+
+class MirrorCache:
+    """
+    Bare mirror of a repository, kept in the cache between runs.
+    The mirrors are named by the hash of the URL of the repository,
+    local paths and file:// URLs are also accepted.
+    """
+
+    def __init__(self, repo_url: str) -> None:
+        """
+        repo_url: The URL or the local path of the repository.
+        """
+        if os.path.isdir(repo_url):
+            repo_url = os.path.abspath(repo_url)
+        self.repo_url = repo_url
+        key = hashlib.sha256(repo_url.encode()).hexdigest()[:16]
+        self.mirror_dir = os.path.join(cache_dir("mirrors"), key + ".git")
+
+    def open(self, fetch: bool = True) -> Repo:
+        """
+        Open the mirror, cloning it the first time.
+        Later, only the new commits of the branches are fetched.
+        """
+        if not os.path.isdir(self.mirror_dir):
+            return self._clone()
+        repo = Repo(self.mirror_dir)
+        if fetch:
+            repo.git.fetch("origin", "--prune", "+refs/heads/*:refs/heads/*")
+        return repo
+
+    def worktree(self, repo: Repo, *arguments: str) -> None:
+        """
+        Run a git worktree command on the mirror.
+        The worktrees of a mirror can be changed by several processes,
+        so the commands hold a lock on the mirror.
+        """
+        lock_path = os.path.join(self.mirror_dir, "cdde.lock")
+        with open(lock_path, 'w', encoding="utf-8") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                repo.git.worktree(*arguments)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def opened(repo: Repo | None) -> Repo:
+        """
+        Check that the mirror was opened before using its repository.
+        """
+        if repo is None:
+            raise ValueError("The mirror of the repository is not opened")
+        return repo
+
+    def _clone(self) -> Repo:
+        """
+        Clone the bare mirror in a temporary directory of the cache
+        and move it to its place, so an interrupted clone is not reused.
+        """
+        tmp_dir = tempfile.mkdtemp(dir=os.path.dirname(self.mirror_dir))
+        Repo.clone_from(self.repo_url, tmp_dir, bare=True)
+        os.rename(tmp_dir, self.mirror_dir)
+        return Repo(self.mirror_dir)
 
 
 class GitClone:
@@ -25,20 +92,23 @@ class GitClone:
         self.pr_number = pr_number
         self.branch = main_branch
         self.work_dir = os.getcwd()
-        self.repo_dir = os.path.join(self.work_dir, "repo-git")
-        self.repo = None
+        self.mirror = MirrorCache(repo_url)
+        self.repo_dir = self.mirror.mirror_dir
+        self.repo: Repo | None = None
         self.before_dir = ""
         self.after_dir = ""
 
     def run(self) -> tuple[str, str]:
         """
-        Runs the process of cloning the repo and checking out the PR.
+        Runs the process of updating the mirror and checking out the PR.
         """
         self._create_dirs()
-        self._clone_repo()
-        self._before_dir()
-        self._after_dir()
-        self._return_paths()
+        try:
+            self._open_repo()
+            self._before_dir()
+            self._after_dir()
+        finally:
+            self._return_paths()
         return self.before_dir, self.after_dir
 
     def _create_dirs(self) -> None:
@@ -56,35 +126,33 @@ class GitClone:
             capture_output=True,
             check=True).stdout.decode().strip()
 
-    def _clone_repo(self) -> None:
+    def _open_repo(self) -> None:
         """
-        Clones the repository into the repo directory,
-        using the gitpython library.
+        Opens the mirror of the repository, fetching the new commits,
+        and prunes the worktrees left by interrupted runs.
         """
-        os.makedirs(self.repo_dir, exist_ok=True)
-        shutil.rmtree(self.repo_dir)
-        self.repo = Repo.clone_from(self.repo_url, self.repo_dir)
+        self.repo = self.mirror.open()
+        self.mirror.worktree(self.repo, "prune")
 
     def _before_dir(self) -> None:
         """
-        Move repo snapshot using fetch and checkout.
-        Later, it copies the repo to the before directory.
+        Check out the main branch
+        in the before directory as a worktree.
         """
         os.chdir(self.repo_dir)
-        self.repo.git.fetch("origin", self.branch)
-        self.repo.git.checkout(self.branch)
-        shutil.copytree(self.repo_dir, self.before_dir, dirs_exist_ok=True)
+        self.mirror.worktree(self.mirror.opened(self.repo), "add", "--detach",
+                             self.before_dir, self.branch)
 
     def _after_dir(self) -> None:
         """
-        Move repo snapshot using fetch and checkout.
-        Later, it copies the repo to the after directory.
+        Fetch the PR and check it out
+        in the after directory as a worktree.
         """
         os.chdir(self.repo_dir)
-        self.repo.git.fetch("origin",
-                            f"pull/{self.pr_number}/head:pr-{self.pr_number}")
-        self.repo.git.checkout(f"pr-{self.pr_number}")
-        shutil.copytree(self.repo_dir, self.after_dir, dirs_exist_ok=True)
+        pr_ref = f"refs/pull/{self.pr_number}/head"
+        repo = self.mirror.opened(self.repo)
+        repo.git.fetch("origin", f"+{pr_ref}:{pr_ref}")
+        self.mirror.worktree(repo, "add", "--detach", self.after_dir, pr_ref)
 
     def _return_paths(self) -> None:
         """
@@ -92,13 +160,25 @@ class GitClone:
         """
         os.chdir(self.work_dir)
 
+    def changed_files(self) -> list[str]:
+        """
+        Gets the files changed by the PR since its merge base with the main branch.
+        Renamed files are listed with both paths.
+        """
+        return self.mirror.opened(self.repo).git.diff(
+            "--name-only", "--no-renames",
+            f"{self.branch}...refs/pull/{self.pr_number}/head").splitlines()
+
     def delete_dir(self) -> None:
         """
-        Deletes the before and after directories.
+        Deletes the before and after worktrees, also if their checkout failed,
+        the mirror stays in the cache.
         """
-        shutil.rmtree(self.before_dir)
-        shutil.rmtree(self.after_dir)
-        shutil.rmtree(self.repo_dir)
+        for directory in (self.before_dir, self.after_dir):
+            if directory:
+                shutil.rmtree(directory, ignore_errors=True)
+        if self.repo is not None:
+            self.mirror.worktree(self.repo, "prune")
 
 
 class TraverseGitLog:
@@ -106,89 +186,113 @@ class TraverseGitLog:
     Class that traverses the git log of a repository.
     """
 
-    def __init__(self, repo_url: str, main_branch: str = "master") -> None:
+    def __init__(self, repo_url: str, main_branch: str = "master",
+                 fetch: bool = True) -> None:
         """
         repo_url: The URL of the repository.
         main_branch: the branch you want to merge into. Default is master.
+        fetch: if the mirror of the repository is updated before traversing.
         """
         self.repo_url = repo_url
         self.branch = main_branch
+        self.fetch = fetch
         self.git_log: list[str] = []
         self.work_dir = os.getcwd()
-        self.repo_dir = os.path.join(self.work_dir, "git-log-traverse")
-        self.repo = None
+        self.mirror = MirrorCache(repo_url)
+        self.repo_dir = self.mirror.mirror_dir
+        self.repo: Repo | None = None
         self.before_dir = ""
         self.after_dir = ""
 
-    def run_traverse(self) -> Generator[str, str, None]:
+    def run_traverse(self, start: int = 0,
+                     stop: int | None = None) -> Generator[str, str, None]:
         """
-        Runs the process of cloning all version of the repository.
+        Runs the process of checking out all version of the repository.
+        start and stop select a range of the commit pairs to traverse.
         """
-        self._clone_repo()
-        self._set_git_log()
-        if len(self.git_log) > 501:
-            # set the maximum number of iterations
-            iter_range = 500
-        else:
-            iter_range = len(self.git_log) - 1
-        for n_commit in range(iter_range):
+        iter_range = self.count_pairs()
+        if stop is not None:
+            iter_range = min(stop, iter_range)
+        for n_commit in range(start, iter_range):
             self._create_dirs()
             self._before_dir(n_commit)
             self._after_dir(n_commit + 1)
             self._return_paths()
             yield self.before_dir, self.after_dir
 
+    def run_sliding_traverse(self, start: int = 0,
+                             stop: int | None = None) -> Generator[str, None, None]:
+        """
+        Runs the process of checking out each commit only once,
+        the snapshot of a commit is the after of a pair and the before of the next one.
+        start and stop select a range of the commit pairs to traverse.
+        """
+        iter_range = self.count_pairs()
+        if stop is not None:
+            iter_range = min(stop, iter_range)
+        if start >= iter_range:
+            return
+        for n_commit in range(start, iter_range + 1):
+            snapshot_dir = self._create_dir("snapshot")
+            os.chdir(self.repo_dir)
+            self.mirror.worktree(self.mirror.opened(self.repo), "add", "--detach",
+                                 snapshot_dir, self.git_log[n_commit])
+            self._return_paths()
+            yield snapshot_dir
+
+    def count_pairs(self) -> int:
+        """
+        Opens the mirror and returns the number of commit pairs to traverse.
+        """
+        self.repo = self.mirror.open(self.fetch)
+        self._set_git_log()
+        if len(self.git_log) > 501:
+            # set the maximum number of iterations
+            return 500
+        return len(self.git_log) - 1
+
     def _set_git_log(self) -> None:
         """
         Sets the git log for the repository.
         """
         self.git_log = [
-            commit.hexsha for commit in self.repo.iter_commits(self.branch)
+            commit.hexsha
+            for commit in self.mirror.opened(self.repo).iter_commits(self.branch)
         ][::-1]
 
-    def _clone_repo(self) -> None:
-        """
-        Clones the repository into the repo directory,
-        using the gitpython library.
-        """
-        os.makedirs(self.repo_dir, exist_ok=True)
-        shutil.rmtree(self.repo_dir)
-        self.repo = Repo.clone_from(self.repo_url, self.repo_dir)
-
     def _create_dirs(self) -> None:
         """
         Creates the before and after directories,
         using mktemp to create a temporary directory.
         """
+        self.before_dir = self._create_dir("before")
+        self.after_dir = self._create_dir("after")
+
+    def _create_dir(self, prefix: str) -> str:
+        """
+        Creates a temporary directory using mktemp.
+        """
         os.makedirs(self.work_dir, exist_ok=True)
-        self.before_dir = subprocess.run(
-            ["mktemp", "-d", "before.XXXX", "-p", self.work_dir],
-            capture_output=True,
-            check=True).stdout.decode().strip()
-        self.after_dir = subprocess.run(
-            ["mktemp", "-d", "after.XXXX", "-p", self.work_dir],
+        return subprocess.run(
+            ["mktemp", "-d", f"{prefix}.XXXX", "-p", self.work_dir],
             capture_output=True,
             check=True).stdout.decode().strip()
 
     def _before_dir(self, n_commit: int) -> None:
         """
-        Move the before repo to specific commit.
+        Check out a specific commit in the before directory as a worktree.
         """
         os.chdir(self.repo_dir)
-        self.repo.git.fetch("origin", self.branch)
-        self.repo.git.checkout(self.git_log[n_commit])
-        shutil.copytree(self.repo_dir, self.before_dir, dirs_exist_ok=True)
-        self.repo.git.checkout(self.branch)
+        self.mirror.worktree(self.mirror.opened(self.repo), "add", "--detach",
+                             self.before_dir, self.git_log[n_commit])
 
     def _after_dir(self, n_commit: int) -> None:
         """
-        Move the after repo to specific commit.
+        Check out a specific commit in the after directory as a worktree.
         """
         os.chdir(self.repo_dir)
-        self.repo.git.fetch("origin", self.branch)
-        self.repo.git.checkout(self.git_log[n_commit])
-        shutil.copytree(self.repo_dir, self.after_dir, dirs_exist_ok=True)
-        self.repo.git.checkout(self.branch)
+        self.mirror.worktree(self.mirror.opened(self.repo), "add", "--detach",
+                             self.after_dir, self.git_log[n_commit])
 
     def _return_paths(self) -> None:
         """
@@ -198,6 +302,14 @@ class TraverseGitLog:
 
     def delete_dir(self, directory: str) -> None:
         """
-        Deletes the specified directory.
+        Deletes the specified snapshot directory.
+        """
+        self.mirror.worktree(self.mirror.opened(self.repo), "remove", "--force", directory)
+
+    def delete_repo(self) -> None:
+        """
+        Prunes the worktrees left in the mirror,
+        the mirror stays in the cache.
         """
-        shutil.rmtree(directory)
+        if self.repo is not None:
+            self.mirror.worktree(self.repo, "prune")
@@ -1,19 +1,32 @@
 """
 This module handles the main execution flow of the application.
 """
+import os
 import sys
+import json
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 import yaml
 
 from .addons_api import load_addons
 from .git_clone import GitClone, TraverseGitLog
+from .cache import PumlCache
+from .design_snapshot import EventRecorder, SnapshotCache, replay, merge_scoped_events
 from .puml_observer import Observer, Modes
+from .design_db import DesignDB
 from .metric_result_observer import ResultObserver
-from .metrics_calculator import MetricsCalculator, MetricsRepository
+from .metrics_calculator import MetricsCalculator, MetricsRepository, TypeMetrics
 from .factory_expr_evaluator import FactoryExprEvaluator
 from .create_boxplots import BoxPlotCreator
 from .veredict import Veredict
 
 FILE_GRAMMAR = "src/addons/grammars/parsimonious_"
+MULTIPLE_RESULTS = "multiples_results.json"
+
+THRESHOLDS_REPOS = [("https://github.com/spf13/cobra", "main"),
+                    ("https://github.com/stretchr/testify", "master"),
+                    ("https://github.com/fyne-io/fyne", "master")]
 
 
 class Main:
@@ -25,12 +38,25 @@ class Main:
         self.language = ""
         self.expr_evaluators: list[tuple[str, dict]] = []
         self.observers = []
+        self.observers_options: dict[str, dict] = {}
+        self.store = "Neo4j"
+        self.design_db: DesignDB | None = None
+        self.parser = "parsimonious"
+        self.filter = "filter"
+        self.extractor: str | None = None
         self.results_observers = []
         self.api = None
         self.set_thresholds = False
         self.result_observers_thresholds = None
         self.mode = ""
         self.exclude = []
+        self.parallel = False
+        self.generator_workers = 1
+        self.diff_scoped = False
+        self.sliding = False
+        self.scope: list[str] | None = None
+        self.uml_cache: PumlCache | None = None
+        self.snapshot_cache: SnapshotCache | None = None
 
     def set_api(self) -> None:
         """
@@ -39,11 +65,61 @@ class Main:
         api = load_addons()
         self.api = api
 
-    def set_observers(self, observer: str) -> None:
+    def set_observers(self, observer: str, **options) -> None:
         """
         Set the dictionaries of objects.
+        The options are passed to the observer when it is created.
         """
         self.observers.append(observer)
+        if options:
+            self.observers_options[observer] = options
+
+    def set_store(self, store: str) -> None:
+        """
+        Set the design database to query and clean.
+        """
+        self.store = store
+        self.design_db = None
+
+    def _get_design_db(self) -> DesignDB:
+        """
+        Get the design database of the store, created once.
+        The observer of the store gets the options of the design database,
+        so it writes where the design database reads.
+        """
+        if self.design_db is None:
+            self.design_db = self.api.design_db[self.store]()
+            options = self.design_db.observer_options()
+            if options:
+                self.observers_options[self.store] = {
+                    **self.observers_options.get(self.store, {}), **options}
+        return self.design_db
+
+    def _store_observer(self) -> Observer:
+        """
+        Create the observer of the store, to clean it or shift it.
+        """
+        self._get_design_db()
+        return self.api.observers[self.store](**self.observers_options.get(self.store, {}))
+
+    def set_parser(self, parser: str) -> None:
+        """
+        Set the parser of the PlantUML files.
+        """
+        self.parser = parser
+
+    def set_filter(self, filter_name: str) -> None:
+        """
+        Set the filter between the parser and the observers.
+        """
+        self.filter = filter_name
+
+    def set_extractor(self, extractor: str | None) -> None:
+        """
+        Set the design extractor that reads the snapshots from their sources.
+        None generates and parses the PlantUML files.
+        """
+        self.extractor = extractor
 
     def set_result_observers(self, result_observer: str) -> None:
         """
@@ -70,32 +146,218 @@ class Main:
             print("Error: The yaml file is not valid.")
             sys.exit(1)
 
-    def _generate_uml(self, directory: str) -> str:
+    def _generate_uml(self, directory: str, scoped: bool = True) -> str:
         """
         Generate the PlantUML file.
+        scoped: if the generation is restricted to the scope of the analysis.
+        """
+        scope = self.scope if scoped else None
+        generator = self.api.generators[self.language](self.exclude)
+        generator.set_scope(scope)
+        generator.set_workers(self.generator_workers)
+        if self.uml_cache is None:
+            return generator.generate_plantuml(directory)
+        key = self.uml_cache.key(self.language, generator.tool_version(),
+                                 self.exclude, scope, directory)
+        if key is None:
+            return generator.generate_plantuml(directory)
+        cached = self.uml_cache.get(key)
+        if cached is not None:
+            uml_path = os.path.join(directory, "cached_UML.plantuml")
+            shutil.copyfile(cached, uml_path)
+            return uml_path
+        uml_path = generator.generate_plantuml(directory)
+        self.uml_cache.put(key, uml_path)
+        return uml_path
+
+    def _set_scope(self, before: str, after: str, changed_files: list[str]) -> None:
+        """
+        Restrict the generation to the packages changed and their direct dependents,
+        in either snapshot. Without changed sources, the whole snapshots are generated.
+        """
+        generator = self.api.generators[self.language](self.exclude)
+        scope = (generator.scope_packages(before, changed_files) |
+                 generator.scope_packages(after, changed_files))
+        self.scope = sorted(scope) if scope else None
+
+    def _generate_umls(self, before: str, after: str) -> tuple[str, str]:
+        """
+        Generate the PlantUML files of both snapshots.
+        The generators run external tools, so they are run in threads.
+        """
+        if not self.parallel:
+            return self._generate_uml(before), self._generate_uml(after)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            uml_before = executor.submit(self._generate_uml, before)
+            uml_after = executor.submit(self._generate_uml, after)
+            return uml_before.result(), uml_after.result()
+
+    def _parse_snapshots(self, uml_before: str, uml_after: str) -> None:
+        """
+        Parse the PlantUML files of both snapshots,
+        each one with its own observers.
+        The parsers are bound by the CPU, so in parallel each snapshot
+        is parsed in its own process. The events of the snapshots are sent
+        to the observers in order, the console printer also needs it.
+        """
+        if not self.parallel:
+            self.parse(uml_before, Modes.BEFORE)
+            self.parse(uml_after, Modes.AFTER)
+            return
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            snapshots = [(executor.submit(parse_snapshot, self.language, self.parser,
+                                          self.filter, self.snapshot_cache is not None,
+                                          uml_path, mode), mode)
+                         for uml_path, mode in ((uml_before, Modes.BEFORE),
+                                                (uml_after, Modes.AFTER))]
+            for events, mode in snapshots:
+                replay(events.result(), self._set_composable_obs(self.observers), mode)
+
+    def _extract_snapshots(self, before: str, after: str) -> None:
+        """
+        Extract the design of both snapshots, each one with its own observers.
+        """
+        if not self.parallel or 'printer' in self.observers:
+            self.extract(before, Modes.BEFORE)
+            self.extract(after, Modes.AFTER)
+            return
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            extract_before = executor.submit(self.extract, before, Modes.BEFORE)
+            extract_after = executor.submit(self.extract, after, Modes.AFTER)
+            extract_before.result()
+            extract_after.result()
+
+    def extract(self, directory: str, mode: Modes, scoped: bool = True,
+                observer: Observer | None = None) -> None:
+        """
+        Extract the design of a snapshot from its source files.
+        scoped: if the extraction is restricted to the scope of the analysis.
+        observer: receives the design, by default the observers of the analysis.
+        """
+        extractor = self.api.extractors[self.extractor](self.exclude)
+        extractor.set_scope(self.scope if scoped else None)
+        extractor.set_cache(self.snapshot_cache is not None)
+        if observer is None:
+            observer = self._set_composable_obs(self.observers)
+        _filter = self.api.observers[self.filter](observer)
+        _filter.set_mode(mode)
+        extractor.extract_design(directory, _filter)
+
+    def _read_design(self, directory: str, mode: Modes, scoped: bool,
+                     observer: Observer | None = None) -> list[tuple]:
+        """
+        Get the events of the design of a snapshot, generating and parsing
+        its PlantUML file or extracting it.
+        The events are also sent to the observer, if there is one.
+        """
+        recorder = EventRecorder(observer if observer is not None
+                                 else self.api.observers['composable']([]))
+        if self.extractor is not None:
+            self.extract(directory, mode, scoped, recorder)
+            return recorder.events
+        uml_path = self._generate_uml(directory, scoped)
+        self.parse(uml_path, mode, recorder)
+        self.delete_plantuml(uml_path)
+        return recorder.events
+
+    def _evaluate_scoped(self, before: str, after: str,
+                         result_observer: ResultObserver) -> None:
+        """
+        Evaluate the snapshots of a PR, generating only the packages of the scope.
+        The whole before snapshot is read, usually from the caches,
+        since it is the main branch. The after snapshot is the whole before snapshot
+        with the packages of the scope replaced by their version in the PR,
+        so the metrics still describe the whole repository.
         """
-        return self.api.generators[self.language](self.exclude).generate_plantuml(
-            directory)
+        self.clean_db()
+
+        def read_before() -> tuple[list[tuple], list[tuple]]:
+            whole = self._read_design(before, Modes.BEFORE, False,
+                                      self._set_composable_obs(self.observers))
+            return whole, self._read_design(before, Modes.BEFORE, True)
+
+        if not self.parallel or 'printer' in self.observers:
+            whole, scoped_before = read_before()
+            scoped_after = self._read_design(after, Modes.AFTER, True)
+        else:
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                before_events = executor.submit(read_before)
+                after_events = executor.submit(self._read_design, after, Modes.AFTER, True)
+                whole, scoped_before = before_events.result()
+                scoped_after = after_events.result()
+        replay(merge_scoped_events(whole, scoped_before, scoped_after),
+               self._set_composable_obs(self.observers), Modes.AFTER)
+        self.run_queries(result_observer)
+
+    def _evaluate_snapshots(self, before: str, after: str,
+                            result_observer: ResultObserver) -> None:
+        """
+        Generate, parse and query the before and after snapshots.
+        With a design extractor, the snapshots are extracted instead.
+        """
+        if self.scope is not None:
+            self._evaluate_scoped(before, after, result_observer)
+            return
+        if self.extractor is not None:
+            self.clean_db()
+            self._extract_snapshots(before, after)
+            self.run_queries(result_observer)
+            return
+
+        # Generate the plantuml file
+        archivo_plantuml_before, archivo_plantuml_after = self._generate_umls(
+            before, after)
 
-    def parse(self, file: str, mode: Modes) -> None:
+        # Clean the database
+        self.clean_db()
+
+        # Parse the plantuml file
+        self._parse_snapshots(archivo_plantuml_before, archivo_plantuml_after)
+
+        # Run the queries
+        self.run_queries(result_observer)
+
+        # Delete the plantuml file
+        self.delete_plantuml(archivo_plantuml_before)
+        self.delete_plantuml(archivo_plantuml_after)
+
+    def parse(self, file: str, mode: Modes, observer: Observer | None = None) -> None:
         """
         Parse the PlantUML file.
-        """
-        observer = self._set_composable_obs(self.observers)
-        _filter = self.api.observers['filter'](observer)
+        If the same file was parsed before, its cached events are replayed.
+        observer: receives the design, by default the observers of the analysis.
+        """
+        if observer is None:
+            observer = self._set_composable_obs(self.observers)
+        grammar = FILE_GRAMMAR + self.language + ".txt"
+        key = None
+        if self.snapshot_cache is not None:
+            key = self.snapshot_cache.key(self.language, self.parser, self.filter,
+                                         file, grammar, (self.api.parsers[self.parser],
+                                                         self.api.observers[self.filter]))
+            events = self.snapshot_cache.load(key)
+            if events is not None:
+                replay(events, observer, mode)
+                return
+            observer = EventRecorder(observer)
+        _filter = self.api.observers[self.filter](observer)
         _filter.set_mode(mode)
-        parser = self.api.parsers['parsimonious'](_filter, FILE_GRAMMAR +
-                                                  self.language + ".txt")
+        parser = self.api.parsers[self.parser](_filter, grammar)
         parser.parse_uml(file)
         _filter = None
+        if key is not None:
+            self.snapshot_cache.store(key, observer.events)
 
     def _set_composable_obs(self, observers: list) -> Observer:
         """
         Set the composable observers.
         """
+        if self.store in observers:
+            self._get_design_db()
         lst = []
         for observer in observers:
-            lst.append(self.api.observers[observer]())
+            options = self.observers_options.get(observer, {})
+            lst.append(self.api.observers[observer](**options))
         return self.api.observers['composable'](lst)
 
     def delete_plantuml(self, file: str) -> None:
@@ -110,7 +372,7 @@ class Main:
         """
         factory_expr_evaluator = FactoryExprEvaluator()
         metrics_api = MetricsRepository()
-        design_db = self.api.design_db['Neo4j']()
+        design_db = self._get_design_db()
         for expr_eval_name, queries in self.expr_evaluators:
             expr_evaluator = factory_expr_evaluator.create_evaluator(
                 expr_eval_name, self.api)
@@ -138,6 +400,47 @@ class Main:
     def set_exclude(self, exclude: list) -> None:
         self.exclude = exclude
 
+    def set_uml_cache(self, uml_cache: bool) -> None:
+        """
+        Set if the generated PlantUML files are cached between runs,
+        in the plantuml directory of the cache (see cache_dir).
+        """
+        self.uml_cache = PumlCache() if uml_cache else None
+
+    def set_snapshot_cache(self, snapshot_cache: bool) -> None:
+        """
+        Set if the parsed snapshots are cached between runs,
+        in the snapshots directory of the cache (see cache_dir).
+        """
+        self.snapshot_cache = SnapshotCache() if snapshot_cache else None
+
+    def set_sliding(self, sliding: bool) -> None:
+        """
+        Set if each commit is generated and parsed only once
+        when traversing the git log.
+        """
+        self.sliding = sliding
+
+    def set_generator_workers(self, workers: int) -> None:
+        """
+        Set the number of processes run in parallel by the PlantUML generator,
+        0 is one per CPU.
+        """
+        self.generator_workers = workers
+
+    def set_diff_scoped(self, diff_scoped: bool) -> None:
+        """
+        Set if only the packages touched by the PR are generated,
+        the rest of the after snapshot is taken from the before snapshot.
+        """
+        self.diff_scoped = diff_scoped
+
+    def set_parallel(self, parallel: bool) -> None:
+        """
+        Set if the before and after snapshots are processed concurrently.
+        """
+        self.parallel = parallel
+
     def set_uri(self, uri: str) -> None:
         """
         print the URI of the Neo4j database in uri.txt.
@@ -149,7 +452,6 @@ class Main:
         """
         Delete the uri.txt file.
         """
-        import os
         if os.path.exists("uri.txt"):
             os.remove("uri.txt")
 
@@ -157,7 +459,13 @@ class Main:
         """
         Clean the database.
         """
-        self.api.observers['Neo4j']().delete_all()
+        self._store_observer().delete_all()
+
+    def shift_db(self) -> None:
+        """
+        Make the after snapshot of the database the before snapshot.
+        """
+        self._store_observer().shift_snapshots()
 
     def _get_yaml_as_dict(self, filepath: str) -> dict[str, str]:
         """
@@ -172,27 +480,15 @@ class Main:
         """
         # Git examples
         git_clone = GitClone(repo_git, main_branch, pr_number)
-        before, after = git_clone.run()
-        # Generate the plantuml file
-        archivo_plantuml_before = self._generate_uml(before)
-        archivo_plantuml_after = self._generate_uml(after)
-
-        # Clean the database
-        self.clean_db()
-
-        # Parse the plantuml file
-        self.parse(archivo_plantuml_before, Modes.BEFORE)
-        self.parse(archivo_plantuml_after, Modes.AFTER)
-
-        # Run the queries
-        self.run_queries(self._set_result_obs(self.results_observers))
-
-        # Delete the plantuml file
-        self.delete_plantuml(archivo_plantuml_before)
-        self.delete_plantuml(archivo_plantuml_after)
-
-        # Delete the temporary directories
-        git_clone.delete_dir()
+        try:
+            before, after = git_clone.run()
+            if self.diff_scoped:
+                self._set_scope(before, after, git_clone.changed_files())
+            self._evaluate_snapshots(before, after,
+                                     self._set_result_obs(self.results_observers))
+        finally:
+            # Delete the temporary directories, also if the evaluation failed
+            git_clone.delete_dir()
         self.delete_uri()
 
         visual = False
@@ -203,52 +499,176 @@ class Main:
         veredictor.set_global_threshold(self.mode)
         veredictor.evaluate(visual)
 
-    def run_set_thresholds(self):
+    def _set_thresholds_config(self, store: str, uri: str) -> None:
         """
-        Run the set thresholds process.
+        Set the options of the set thresholds process.
         """
         self.set_language("go")
-        self.set_observers("Neo4j")
+        self.set_observers(store)
+        self.set_store(store)
         self.set_result_observers("json")
-        self.set_expr_evaluator("src/queries/cypher.yml")
+        if store == "memory":
+            self.set_expr_evaluator("src/queries/memory.yml")
+        else:
+            self.set_expr_evaluator("src/queries/cypher.yml")
         self.set_expr_evaluator("src/queries/derived_metrics.yml")
         self.set_expr_evaluator("src/queries/sqlite.yml")
-        self.set_uri("bolt://localhost:7689")
-
-        repos = [("https://github.com/spf13/cobra", "main"),
-                 ("https://github.com/stretchr/testify", "master"),
-                 ("https://github.com/fyne-io/fyne", "master")]
+        self.set_uri(uri)
 
-        for repo, branch in repos:
-            git_traverse = TraverseGitLog(repo, branch)
-            directories = git_traverse.run_traverse()
-            result_observer = self._set_result_obs(self.results_observers)
-            for directory in directories:
-                before = directory[0]
-                after = directory[1]
-                # Generate the plantuml file
-                archivo_plantuml_before = self._generate_uml(before)
-                archivo_plantuml_after = self._generate_uml(after)
+    def run_thresholds_pairs(self, git_traverse: TraverseGitLog,
+                             start: int = 0, stop: int | None = None) -> None:
+        """
+        Evaluate a range of the commit pairs of a repository.
+        """
+        if self.sliding:
+            self._run_thresholds_sliding(git_traverse, start, stop)
+            return
+        directories = git_traverse.run_traverse(start, stop)
+        result_observer = self._set_result_obs(self.results_observers)
+        for directory in directories:
+            before = directory[0]
+            after = directory[1]
+            self._evaluate_snapshots(before, after, result_observer)
 
-                self.clean_db()
+            # Delete the temporary directories
+            git_traverse.delete_dir(before)
+            git_traverse.delete_dir(after)
 
-                # Parse the plantuml file
-                self.parse(archivo_plantuml_before, Modes.BEFORE)
-                self.parse(archivo_plantuml_after, Modes.AFTER)
+        git_traverse.delete_repo()
 
+    def _run_thresholds_sliding(self, git_traverse: TraverseGitLog,
+                                start: int = 0, stop: int | None = None) -> None:
+        """
+        Evaluate a range of the commit pairs of a repository,
+        generating and parsing each commit once.
+        After the queries of a pair, its after snapshot becomes the next before.
+        """
+        result_observer = self._set_result_obs(self.results_observers)
+        self.clean_db()
+        mode = Modes.BEFORE
+        for directory in git_traverse.run_sliding_traverse(start, stop):
+            if self.extractor is not None:
+                self.extract(directory, mode)
+            else:
+                archivo_plantuml = self._generate_uml(directory)
+                self.parse(archivo_plantuml, mode)
+                self.delete_plantuml(archivo_plantuml)
+            if mode == Modes.AFTER:
                 self.run_queries(result_observer)
+                self.shift_db()
+            mode = Modes.AFTER
+
+            git_traverse.delete_dir(directory)
+
+        git_traverse.delete_repo()
+
+    def _merge_multiples_results(self, results: list[dict]) -> None:
+        """
+        Merge the results of the workers in the multiples results file,
+        in the order of the commit pairs.
+        """
+        data: dict = {}
+        if os.path.exists(MULTIPLE_RESULTS) and os.path.getsize(MULTIPLE_RESULTS) > 0:
+            with open(MULTIPLE_RESULTS, 'r', encoding="utf-8") as file:
+                data = json.load(file)
+        for result in results:
+            for kind, metrics in result.items():
+                if kind == TypeMetrics.GLOBAL:
+                    for metric, values in metrics.items():
+                        data.setdefault(kind, {}).setdefault(
+                            metric, []).extend(values)
+                else:
+                    data.setdefault(kind, {}).update(metrics)
+        with open(MULTIPLE_RESULTS, 'w', encoding="utf-8") as file:
+            json.dump(data, file, indent=4)
+
+    def _run_set_thresholds_parallel(self, workers: int, store: str,
+                                     uris: list[str]) -> None:
+        """
+        Shard the commit pairs of each repository across worker processes.
+        The mirror of the repository is updated once, the workers only read it.
+        Each worker has its own design store: the memory store of its Main,
+        or one of the Neo4j databases given.
+        """
+        if store != "memory" and len(uris) < workers:
+            print("Error: each worker needs its own Neo4j database, "
+                  "set one uri per worker.")
+            sys.exit(1)
+        for repo, branch in THRESHOLDS_REPOS:
+            git_traverse = TraverseGitLog(repo, branch)
+            pairs = git_traverse.count_pairs()
+            shard = max(1, -(-pairs // workers))
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(run_thresholds_shard, store, uris[n_shard % len(uris)],
+                                    repo, branch,
+                                    start, min(start + shard, pairs), self.sliding)
+                    for n_shard, start in enumerate(range(0, pairs, shard))
+                ]
+                results = [future.result() for future in futures]
+            self._merge_multiples_results(results)
+            git_traverse.delete_repo()
+
+    def run_set_thresholds(self, workers: int = 1, store: str = "Neo4j",
+                           uris: list[str] | None = None) -> None:
+        """
+        Run the set thresholds process.
+        """
+        uris = uris or ["bolt://localhost:7689"]
+        if workers > 1:
+            self._run_set_thresholds_parallel(workers, store, uris)
+        else:
+            self._set_thresholds_config(store, uris[0])
+            for repo, branch in THRESHOLDS_REPOS:
+                self.run_thresholds_pairs(TraverseGitLog(repo, branch))
+            self.delete_uri()
 
-                # Delete the plantuml file
-                self.delete_plantuml(archivo_plantuml_before)
-                self.delete_plantuml(archivo_plantuml_after)
-
-                # Delete the temporary directories
-                git_traverse.delete_dir(before)
-                git_traverse.delete_dir(after)
-
-            git_traverse.delete_dir(git_traverse.repo_dir)
-
-        self.delete_uri()
         box_plot_creator = BoxPlotCreator("results.json")
         box_plot_creator.create_boxplots()
         box_plot_creator.store_percentiles_90()
+
+
+def parse_snapshot(language: str, parser: str, filter_name: str, snapshot_cache: bool,
+                   uml_path: str, mode: Modes) -> list[tuple]:
+    """
+    Worker of the parallel parse, parses the PlantUML file of a snapshot.
+    Returns the events of its design, to be sent to the observers of the analysis.
+    """
+    main = Main()
+    main.set_api()
+    main.set_language(language)
+    main.set_parser(parser)
+    main.set_filter(filter_name)
+    main.set_snapshot_cache(snapshot_cache)
+    recorder = EventRecorder(main.api.observers['composable']([]))
+    main.parse(uml_path, mode, recorder)
+    return recorder.events
+
+
+def run_thresholds_shard(store: str, uri: str, repo: str, branch: str,
+                         start: int, stop: int, sliding: bool = False) -> dict:
+    """
+    Worker of the set thresholds process, evaluates a range of commit pairs.
+    It runs in a scratch directory linked to the sources,
+    so the files written by each worker are isolated.
+    Returns the multiples results of the range.
+    """
+    work_dir = os.getcwd()
+    scratch_dir = tempfile.mkdtemp(prefix="worker.", dir=work_dir)
+    os.symlink(os.path.join(work_dir, "src"), os.path.join(scratch_dir, "src"))
+    os.chdir(scratch_dir)
+    try:
+        main = Main()
+        main.set_api()
+        main.set_thresholds = True
+        main.set_sliding(sliding)
+        main._set_thresholds_config(store, uri)  # pylint: disable=protected-access
+        main.run_thresholds_pairs(TraverseGitLog(repo, branch, fetch=False),
+                                  start, stop)
+        if not os.path.exists(MULTIPLE_RESULTS):
+            return {}
+        with open(MULTIPLE_RESULTS, 'r', encoding="utf-8") as file:
+            return json.load(file)
+    finally:
+        os.chdir(work_dir)
+        shutil.rmtree(scratch_dir)
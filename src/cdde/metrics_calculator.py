@@ -81,6 +81,7 @@ class MetricsCalculator:
         Executes all metrics.
         """
         self.result_observer.open_observer()
+        self.exp_eval.set_design_db(self.design_db)
         self._get_base_metrics(self.design_db)
         self._set_metrics(self.exp_eval)
         self.result_observer.close_observer()
@@ -98,8 +99,6 @@ class MetricsCalculator:
 
     def __get_packages(self, design_db: DesignDB) -> None:
         """ Set the packages of the design_db."""
-        for class_name in self.classes:
-            design_db.set_packages(class_name)
         self.packages = design_db.get_all_packages()
 
     def _set_metrics(self, evaluator: ExprEvaluator) -> None:
@@ -124,13 +123,17 @@ class MetricsCalculator:
             case TypeMetrics.GLOBAL:
                 self._run_calc(list_of_queries, type_metrics, evaluator)
             case TypeMetrics.PER_CLASS:
+                grouped = self._run_grouped_calc(list_of_queries, type_metrics,
+                                                 evaluator, self.classes)
                 for class_name in self.classes:
-                    self._run_calc(list_of_queries, type_metrics,
-                                   evaluator, class_name)
+                    self._run_argument_calc(list_of_queries, grouped, type_metrics,
+                                            evaluator, class_name)
             case TypeMetrics.PER_PACKAGE:
+                grouped = self._run_grouped_calc(list_of_queries, type_metrics,
+                                                 evaluator, self.packages)
                 for package_name in self.packages:
-                    self._run_calc(list_of_queries, type_metrics,
-                                   evaluator, package_name)
+                    self._run_argument_calc(list_of_queries, grouped, type_metrics,
+                                            evaluator, package_name)
         return None
 
     def _run_calc(self,
@@ -148,22 +151,68 @@ class MetricsCalculator:
             params = self.__set_params(argument, type_metrics)
             results_api = self.results.get_metrics_dict()
             result = evaluator.eval(query['query'], params, results_api)
-
-            if isinstance(result, dict):    # if the result is a dictionary (form SQL query)
-                for key, value in result.items():
-                    metric_name = self.__set_metric_name(query['metric'], type_metrics,
-                                                         argument) + key[0]
-                    self.results.add_metric(metric_name, value)
-                    # Send the result to the observer
-                    self.__send_results(
-                        query, type_metrics, metric_name, value)
-                continue
-            metric_name = self.__set_metric_name(query['metric'], type_metrics,
-                                                 argument)
-            self.results.add_metric(metric_name, result)
-
-            # Send the result to the observer
-            self.__send_results(query, type_metrics, metric_name, result)
+            self.__add_result(query, type_metrics, argument, result)
+
+    def __add_result(self, query: dict, type_metrics: TypeMetrics,
+                     argument: str, result: MetricType | dict) -> None:
+        """
+        Set the result of a query in the results dictionary
+        and send it to the observer.
+        """
+        if isinstance(result, dict):    # if the result is a dictionary (form SQL query)
+            for key, value in result.items():
+                metric_name = self.__set_metric_name(query['metric'], type_metrics,
+                                                     argument) + key[0]
+                self.results.add_metric(metric_name, value)
+                # Send the result to the observer
+                self.__send_results(
+                    query, type_metrics, metric_name, value)
+            return
+        metric_name = self.__set_metric_name(query['metric'], type_metrics,
+                                             argument)
+        self.results.add_metric(metric_name, result)
+
+        # Send the result to the observer
+        self.__send_results(query, type_metrics, metric_name, result)
+
+    def _run_grouped_calc(self,
+                          list_of_queries: list,
+                          type_metrics: TypeMetrics,
+                          evaluator: ExprEvaluator,
+                          arguments: list[str]) -> dict[str, dict[str, MetricType]]:
+        """
+        Run the grouped queries of the list, each one returns
+        the metric of all the arguments at once.
+        The rows of each query are returned by its metric.
+        """
+        parameter = "class_name" if type_metrics == TypeMetrics.PER_CLASS else "package_name"
+        grouped: dict[str, dict[str, MetricType]] = {}
+        for query in list_of_queries:
+            if query.get('grouped'):
+                results_api = self.results.get_metrics_dict()
+                grouped[query['metric']] = evaluator.eval_grouped(
+                    query['query'], {parameter: arguments}, results_api)
+        return grouped
+
+    def _run_argument_calc(self,
+                           list_of_queries: list,
+                           grouped: dict[str, dict[str, MetricType]],
+                           type_metrics: TypeMetrics,
+                           evaluator: ExprEvaluator,
+                           argument: str) -> None:
+        """
+        Run the list of queries of an argument (class or package),
+        taking the result of the grouped queries from their rows.
+        The results are set in the order of the queries,
+        as if every query was run for the argument.
+        """
+        for query in list_of_queries:
+            if query['metric'] in grouped:
+                self.__set_params(argument, type_metrics)
+                self.__add_result(query, type_metrics, argument,
+                                  grouped[query['metric']].get(argument, 0))
+            else:
+                self._run_calc([query], type_metrics, evaluator, argument)
 
     def __send_results(self, query: dict, type_metrics: TypeMetrics,
                        metric_name: str, value: str) -> None:
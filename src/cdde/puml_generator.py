@@ -2,16 +2,34 @@
 Abstract class for PlantUML generators.
 """
 from abc import ABC, abstractmethod
+import os
 import subprocess
 
 
+def walk_sources(directory: str, exclude: list, extensions: tuple[str, ...]) -> list[str]:
+    """
+    Get the files of the directory with one of the extensions,
+    in a single walk that skips the excluded directories.
+    """
+    files = []
+    for root, dirs, files_in_dir in os.walk(directory):
+        dirs[:] = [d for d in dirs if d not in exclude]
+        files += [os.path.join(root, file) for file in files_in_dir
+                  if file.endswith(extensions)]
+    return files
+
+
 class PumlGenerator(ABC):
     """
     Abstract class for PlantUML generators.
     """
+    # Extensions of the source files read by the generator.
+    source_extensions: tuple[str, ...] = ()
 
     def __init__(self, exclude: list):
         self.exclude = exclude
+        self.scope: list[str] | None = None
+        self.workers = 1
 
     @abstractmethod
     def generate_plantuml(self, directory: str) -> str:
@@ -28,3 +46,70 @@ class PumlGenerator(ABC):
 
         except subprocess.CalledProcessError:
             print("Error: Failed to delete .plantuml file.")
+
+    def tool_version(self) -> str:
+        """
+        Get the version of the tool that generates the PlantUML files,
+        part of the key of the cached files.
+        """
+        return type(self).__name__
+
+    def set_scope(self, scope: list[str] | None) -> None:
+        """
+        Restrict the generation to the packages of the scope,
+        given as directories relative to the snapshot. None is the whole snapshot.
+        """
+        self.scope = scope
+
+    def set_workers(self, workers: int) -> None:
+        """
+        Set the number of processes of the tool run in parallel, 0 is one per CPU.
+        Generators that cannot split their work run a single process.
+        """
+        self.workers = workers or os.cpu_count() or 1
+
+    def group_by_size(self, sizes: dict[str, int]) -> list[list[str]]:
+        """
+        Split the paths in one group per worker, given the size of their sources.
+        The groups are runs of paths in sorted order, of similar size,
+        so the paths of a subtree are mostly in the same group.
+        """
+        n_groups = min(self.workers, len(sizes))
+        total = sum(sizes.values())
+        groups: list[list[str]] = [[] for _ in range(n_groups)]
+        done = 0
+        for path in sorted(sizes):
+            groups[min(n_groups - 1, done * n_groups // max(total, 1))].append(path)
+            done += sizes[path]
+        return [group for group in groups if group]
+
+    def in_scope(self, directory: str, file: str) -> bool:
+        """
+        Check if a file of the snapshot is in a package of the scope.
+        """
+        if self.scope is None:
+            return True
+        return os.path.relpath(os.path.dirname(file), directory) in self.scope
+
+    def scope_packages(self, directory: str, changed_files: list[str]) -> set[str]:
+        """
+        Get the packages with changed source files
+        and the packages that depend directly on them.
+        """
+        packages = {os.path.dirname(file) or '.' for file in changed_files
+                    if file.endswith(self.source_extensions)}
+        return packages | self.dependents(directory, packages)
+
+    def dependents(self, directory: str,  # pylint: disable=unused-argument
+                   packages: set[str]) -> set[str]:
+        """
+        Get the packages of the snapshot that depend directly on the given packages.
+        By default, the dependencies are not known.
+        """
+        return set()
+
+    def source_files(self, directory: str) -> list[str]:
+        """
+        Get the source files of the snapshot, skipping the excluded directories.
+        """
+        return walk_sources(directory, self.exclude, self.source_extensions)
@@ -11,6 +11,17 @@ class Modes(StrEnum):
     AFTER = 'after'
 
 
+def split_snapshot(name: str) -> tuple[Modes, str]:
+    """
+    Split a name with the snapshot as prefix (e.g. beforeFoo)
+    in the snapshot and the name.
+    """
+    for mode in Modes:
+        if name.startswith(mode.value):
+            return mode, name.removeprefix(mode.value)
+    raise ValueError(f"Name without snapshot: {name}")
+
+
 class Relationship(StrEnum):
     """Enum for the relationships between classes."""
     INHERITANCE = '--|>'
@@ -0,0 +1,85 @@
+"""
+Tests of the in-memory store against the Neo4j store.
+The Neo4j store is only checked if a database is running at its URI.
+"""
+import unittest
+import yaml
+from neo4j.exceptions import Neo4jError, DriverError
+from src.addons.design_db_memory import DesignDBMemory, MemoryObserver, QueriesMemory
+from src.addons.metrics_cypher import QueriesCypher
+from src.addons.obs_neo4j import Neo4j
+from src.cdde.puml_observer import ClassKind, MethodKind, Modes, Observer
+
+
+def send_sample(observer: Observer) -> None:
+    """
+    Send a snapshot with a method of a name that is not a class,
+    as a parser does for the methods of an undeclared class.
+    """
+    observer.set_mode(Modes.BEFORE)
+    observer.open_observer()
+    observer.on_class_found('Shape', ClassKind.ABSTRACT)
+    observer.on_class_found('Circle', ClassKind.CLASS)
+    observer.on_method_found('Shape', 'area', MethodKind.PUBLIC)
+    observer.on_method_found('Shape', '_check', MethodKind.PROTECTED)
+    observer.on_method_found('Circle', 'area', MethodKind.PUBLIC)
+    observer.on_method_found('Circle', '__radius', MethodKind.PRIVATE)
+    observer.on_method_found('Orphan', 'run', MethodKind.PUBLIC)
+    observer.on_method_found('Orphan', 'stop', MethodKind.PUBLIC)
+    observer.close_observer()
+
+
+def cypher_query(metric: str) -> str:
+    """
+    Get the query of a snapshot metric of the Neo4j store.
+    """
+    with open("src/queries/cypher.yml", 'r', encoding="utf-8") as file:
+        queries = yaml.safe_load(file)['snapshot-metrics']
+    return next(query['query'] for group in queries.values()
+                for query in group if query['metric'] == metric)
+
+
+class TestHiddenFactorMethods(unittest.TestCase):
+    """
+    The hidden factor only counts the methods of the classes.
+    """
+
+    def memory_result(self) -> float:
+        """
+        Hidden factor of the sample in the in-memory store.
+        """
+        design_db = DesignDBMemory()
+        send_sample(MemoryObserver(**design_db.observer_options()))
+        evaluator = QueriesMemory()
+        evaluator.set_design_db(design_db)
+        return evaluator.eval('hidden_factor_methods(before)', {}, {})  # type: ignore
+
+    def neo4j_result(self) -> float:
+        """
+        Hidden factor of the sample in the Neo4j store.
+        """
+        observer = Neo4j()
+        try:
+            observer.driver.verify_connectivity()
+        except (Neo4jError, DriverError, OSError):
+            self.skipTest(f"No Neo4j database at {observer.uri}")
+        observer.delete_all()
+        send_sample(observer)
+        query = cypher_query('_before_hidden_factor_methods')
+        return QueriesCypher().eval(query, {}, {})  # type: ignore
+
+    def test_orphan_methods_are_not_counted(self) -> None:
+        """
+        The methods of the orphan name do not change the ratio of the classes.
+        """
+        self.assertAlmostEqual(self.memory_result(), 0.5)
+
+    def test_same_result_as_neo4j(self) -> None:
+        """
+        Both stores give the same ratio.
+        """
+        self.assertAlmostEqual(self.memory_result(), self.neo4j_result())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+"""
+Tests of the metrics calculator.
+The grouped queries must give the same results as the queries run once per name.
+"""
+import copy
+import unittest
+import yaml
+from src.addons.design_db_memory import DesignDBMemory, MemoryObserver, QueriesMemory
+from src.addons.result_obs_composable import ResultComposable
+from src.cdde.metrics_calculator import MetricsCalculator, MetricsRepository
+from src.cdde.puml_observer import ClassKind, Modes, Relationship
+
+
+def send_sample(observer: MemoryObserver) -> None:
+    """
+    Send two snapshots with classes of two packages and relationships between them.
+    """
+    for mode, classes in ((Modes.BEFORE, ['Shape', 'Circle', 'Canvas']),
+                          (Modes.AFTER, ['Shape', 'Circle', 'Square', 'Canvas'])):
+        observer.set_mode(mode)
+        observer.open_observer()
+        observer.on_class_found('Shape', ClassKind.INTERFACE)
+        for class_name in classes[1:]:
+            observer.on_class_found(class_name, ClassKind.CLASS)
+        observer.on_package_found('shapes', classes[:-1])
+        observer.on_package_found('draw', ['Canvas'])
+        for class_name in classes[1:-1]:
+            observer.on_relation_found(class_name, 'Shape', Relationship.IMPLEMENTATION)
+            observer.on_relation_found('Canvas', class_name, Relationship.ASSOCIATION)
+        observer.on_relation_found('Canvas', 'Shape', Relationship.COMPOSITION)
+        observer.close_observer()
+
+
+def ungrouped(queries: dict) -> dict:
+    """
+    Copy the queries without the grouped flag, so they are run once per name.
+    """
+    queries = copy.deepcopy(queries)
+    for metrics in queries.values():
+        if not isinstance(metrics, dict):
+            continue
+        for list_of_queries in metrics.values():
+            for query in list_of_queries or []:
+                query.pop('grouped', None)
+    return queries
+
+
+def calc_results(design_db: DesignDBMemory, queries: dict) -> list[tuple]:
+    """
+    Calculate the metrics of the sample and get the results, in their order.
+    """
+    results = MetricsRepository()
+    MetricsCalculator(QueriesMemory(), design_db, ResultComposable([]),
+                      queries, results).calc_all_expr()
+    return list(results.get_metrics_dict().items())
+
+
+class TestGroupedQueries(unittest.TestCase):
+    """
+    The grouped queries are a faster way to get the same results.
+    """
+
+    def setUp(self) -> None:
+        with open("src/queries/memory.yml", 'r', encoding="utf-8") as file:
+            self.queries = yaml.safe_load(file)
+        self.design_db = DesignDBMemory()
+        send_sample(MemoryObserver(**self.design_db.observer_options()))
+
+    def test_grouped_queries(self) -> None:
+        """
+        The memory queries have grouped per-class and per-package metrics.
+        """
+        snapshot = self.queries['snapshot-metrics']
+        self.assertTrue(any(query.get('grouped') for query in snapshot['per-class']))
+        self.assertTrue(any(query.get('grouped') for query in snapshot['per-package']))
+
+    def test_same_results(self) -> None:
+        """
+        Grouped and per-name evaluation give the same results, in the same order.
+        """
+        grouped = calc_results(self.design_db, self.queries)
+        self.assertIn(('beforeCircle___SEP___instability_class', 0.5), grouped)
+        self.assertEqual(grouped, calc_results(self.design_db, ungrouped(self.queries)))
+
+
+if __name__ == '__main__':
+    unittest.main()
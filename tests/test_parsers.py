@@ -0,0 +1,66 @@
+"""
+Tests of the PlantUML parsers.
+The streaming parsers must send the same events as the parsimonious parser.
+"""
+import glob
+import unittest
+from src.addons.obs_composable import Composable
+from src.addons.parser_parsimonius import Parsimonius
+from src.addons.parser_streaming import StreamingParser, ParallelStreamingParser
+from src.cdde.design_snapshot import EventRecorder
+from src.cdde.puml_observer import Modes
+
+GRAMMAR = "src/addons/grammars/parsimonious_{}.txt"
+
+SAMPLES = {
+    'py': sorted(glob.glob("Samples/**/classes_*.plantuml", recursive=True)),
+    'go': ["Samples/UML.plantuml"] + sorted(glob.glob("Samples/Simple/double-derivative/*/UML.plantuml")),
+}
+
+
+def parse_events(parser_class: type, language: str, file: str, **options) -> list[tuple]:
+    """
+    Parse a file and get the events sent by the parser.
+    """
+    recorder = EventRecorder(Composable([]))
+    recorder.set_mode(Modes.BEFORE)
+    parser_class(recorder, GRAMMAR.format(language), **options).parse_uml(file)
+    return recorder.events
+
+
+class TestParsers(unittest.TestCase):
+    """
+    The parsers send the same events, in the same order.
+    """
+
+    def assert_same_events(self, parser_class: type, **options) -> None:
+        """
+        Compare the events of a parser with the ones of the parsimonious parser.
+        """
+        for language, files in SAMPLES.items():
+            for file in files:
+                with self.subTest(file=file):
+                    self.assertEqual(parse_events(Parsimonius, language, file),
+                                     parse_events(parser_class, language, file, **options))
+
+    def test_samples(self) -> None:
+        """
+        There are samples of both languages.
+        """
+        self.assertTrue(all(SAMPLES.values()))
+
+    def test_streaming(self) -> None:
+        """
+        The streaming parser sends the events of the parsimonious parser.
+        """
+        self.assert_same_events(StreamingParser)
+
+    def test_streaming_parallel(self) -> None:
+        """
+        The parallel parser sends them too, with small chunks so the files are split.
+        """
+        self.assert_same_events(ParallelStreamingParser, chunk_size=64, workers=2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+"""
+Tests of the Go PlantUML generator.
+They need the goplantuml binary, and are skipped without it.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from collections import Counter
+from src.addons.obs_composable import Composable
+from src.addons.parser_streaming import StreamingParser
+from src.addons.support_go import GoPumlGenerator
+from src.cdde.design_snapshot import EventRecorder
+from src.cdde.puml_observer import Modes
+
+GRAMMAR = "src/addons/grammars/parsimonious_go.txt"
+
+# Packages with structs that implement the interfaces of other packages.
+SAMPLE = {
+    "shapes/shapes.go": """package shapes
+
+type Shape interface {
+	Area() float64
+	Scale(factor float64) Shape
+}
+
+type Named interface {
+	Name() string
+}
+""",
+    "circle/circle.go": """package circle
+
+import "example.com/sample/shapes"
+
+type Circle struct {
+	radius float64
+}
+
+func (c *Circle) Area() float64 { return 3 * c.radius * c.radius }
+
+func (c *Circle) Scale(factor float64) shapes.Shape { return &Circle{c.radius * factor} }
+
+func (c *Circle) Name() string { return "circle" }
+""",
+    "square/square.go": """package square
+
+import "example.com/sample/shapes"
+
+type Square struct {
+	side float64
+}
+
+func (s *Square) Area() float64 { return s.side * s.side }
+
+func (s *Square) Scale(factor float64) shapes.Shape { return &Square{s.side * factor} }
+
+type Sided interface {
+	Sides() int
+}
+""",
+    "polygon/polygon.go": """package polygon
+
+type Polygon struct {
+	sides int
+}
+
+func (p *Polygon) Sides() int { return p.sides }
+
+func (p *Polygon) Area() float64 { return 0 }
+""",
+    "go.mod": "module example.com/sample\n",
+}
+
+
+@unittest.skipIf(shutil.which('goplantuml') is None, "goplantuml is not installed")
+class TestGoWorkers(unittest.TestCase):
+    """
+    The diagram of the packages does not depend on the number of workers.
+    """
+
+    def setUp(self) -> None:
+        self.directory = tempfile.mkdtemp() + "/"
+        for path, content in SAMPLE.items():
+            os.makedirs(os.path.dirname(os.path.join(self.directory, path)), exist_ok=True)
+            with open(os.path.join(self.directory, path), 'w', encoding="utf-8") as file:
+                file.write(content)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.directory)
+
+    def events(self, workers: int) -> Counter:
+        """
+        Generate the diagram of the sample and get the events of its design.
+        """
+        generator = GoPumlGenerator([])
+        generator.set_workers(workers)
+        recorder = EventRecorder(Composable([]))
+        recorder.set_mode(Modes.BEFORE)
+        StreamingParser(recorder, GRAMMAR).parse_uml(generator.generate_plantuml(self.directory))
+        return Counter(map(repr, recorder.events))
+
+    def test_same_design_with_workers(self) -> None:
+        """
+        The implementations between packages of different runs are kept.
+        """
+        single = self.events(1)
+        self.assertEqual(single, self.events(2))
+        self.assertEqual(single, self.events(4))
+
+
+if __name__ == '__main__':
+    unittest.main()